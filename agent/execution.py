@@ -1,42 +1,417 @@
 import os
+import stat
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from itertools import chain, repeat
 from pathlib import Path
 from agent.utils.file_helpers import (
     get_file_type, get_file_size_category, get_file_date_category,
-    list_files_in_directory, safe_create_directory, safe_move_file
+    scan_files, safe_create_directory, move_file, leftover_partials
 )
+from agent.index import FileIndex
+from agent.instrumentation import span, count
+from agent.move_plan import MovePlan, build_move_plan, free_destination
+from agent.move_journal import MoveJournal, find_unfinished, find_last, prune
+from agent.move_results import MoveResults
+from agent.utils.fuzzy import rank_matches
+from agent.utils.duplicates import find_duplicate_groups, scan_sizes
+from agent.query import FileQuery
+from agent.progress import Progress
+from config import (
+    MOVE_WORKERS, FUZZY_MAX_DISTANCE, FUZZY_TOP_K, FUZZY_CANDIDATES,
+    DUPLICATE_MIN_SIZE, DUPLICATE_WORKERS, COPY_WORKERS, ORGANIZE_KEYS, MOVE_JOURNAL_DIR
+)
+
+def _completed(function, items, workers, progress):
+    """Yield function(item) as each completes, on up to workers threads"""
+    if workers <= 1:
+        for item in items:
+            if progress.cancelled:
+                return
+            yield function(item)
+        return
+    
+    items = iter(items)
+    running = set()
+    exhausted = False
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            # Only twice as many items as workers run ahead of the consumer
+            while not exhausted and len(running) < 2 * workers and not progress.cancelled:
+                item = next(items, None)
+                if item is None:
+                    exhausted = True
+                else:
+                    # Pool threads do not inherit the caller's trace
+                    running.add(pool.submit(contextvars.copy_context().run, function, item))
+            if not running:
+                return
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+def _found(paths, progress):
+    """Stream events for found paths, stopping once progress is cancelled"""
+    progress.start()
+    for path in paths:
+        progress.advance()
+        yield "found", path
+        if progress.cancelled:
+            break
+    progress.finish()
+
+def _missing_dirs(directories):
+    """directories, known not to exist, together with their missing parents"""
+    missing = []
+    seen = set(directories)
+    for directory in directories:
+        ancestors = [directory]
+        parent = os.path.dirname(directory)
+        while parent not in seen and parent != os.path.dirname(parent) and not os.path.isdir(parent):
+            seen.add(parent)
+            ancestors.append(parent)
+            parent = os.path.dirname(parent)
+        # Checked once, whether it turned out to exist or not
+        seen.add(parent)
+        missing.extend(reversed(ancestors))
+    return missing
 
 class Executor:
-    def __init__(self, memory):
+    def __init__(self, memory, index=None, journal_dir=MOVE_JOURNAL_DIR):
         self.memory = memory
+        self.index = index if index is not None else FileIndex()
+        self.journal_dir = journal_dir
         
-    def organize_by_type(self, directory):
-        """Organize files in directory by their type"""
-        results = {"moved": [], "errors": []}
+    def prewarm(self, directory):
+        """Bring the index for a likely target up to date ahead of time"""
+        try:
+            self.index.refresh(directory)
+        except Exception:
+            # Only a guess; the real operation reports any problem
+            pass
         
+    def _scan(self, directory, since=None):
+        """FileRecords for directory, minus files the since watermark already handled"""
+        if self.index.is_watched(directory):
+            records = self.index.file_records(directory)
+        else:
+            records = list(scan_files(directory))
+            count("listdir")
+            count("stat", len(records))
+        
+        if since:
+            handled = set(since["inodes"])
+            records = [
+                record for record in records
+                if record.inode not in handled or record.ctime > since["last_run"]
+            ]
+        return records
+        
+    def _watermark_key(self, action, use_modified=True, keys=None):
+        """Runs only skip files already handled the same way of organizing"""
+        if action == "organize_by_keys":
+            return f"{action}:{','.join(keys)}:{'modified' if use_modified else 'created'}"
+        if action == "organize_by_date":
+            return f"{action}:{'modified' if use_modified else 'created'}"
+        return action
+        
+    def _unchanged(self, directory, since):
+        """Whether nothing was added, removed or renamed in directory since that run"""
+        if not since or since["mtime_ns"] is None:
+            return False
         try:
-            files = list_files_in_directory(directory)
-            
-            for file_path in files:
-                try:
-                    file_type = get_file_type(file_path)
-                    type_dir = os.path.join(directory, file_type)
-                    safe_create_directory(type_dir)
-                    
-                    file_name = os.path.basename(file_path)
-                    destination = os.path.join(type_dir, file_name)
-                    moved_to = safe_move_file(file_path, destination)
-                    
-                    results["moved"].append({
-                        "from": file_path,
-                        "to": moved_to,
-                        "type": file_type
-                    })
-                    
-                except Exception as e:
-                    results["errors"].append({
-                        "file": file_path,
-                        "error": str(e)
-                    })
+            count("stat")
+            return os.stat(directory).st_mtime_ns == since["mtime_ns"]
+        except OSError:
+            return False
+        
+    def _record_watermark(self, directory, key, move_plan, since, started, failed=()):
+        """Remember the files an organize run left behind, so the next run can skip them"""
+        known = move_plan.inodes.union(since["inodes"]) if since else move_plan.inodes
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+            left_behind = []
+            newcomers = False
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    # Failed files are looked at again by the next run
+                    if not entry.is_file() or entry.path in failed:
+                        continue
+                    if entry.inode() in known:
+                        left_behind.append(entry.inode())
+                    else:
+                        newcomers = True
+            count("listdir")
+        except OSError:
+            # Without a reliable snapshot, the next run simply looks at everything
+            return
+        
+        self.memory.update_watermark(directory, key, {
+            "last_run": started,
+            # A directory that gained files or had failures is always listed again
+            "mtime_ns": None if newcomers or failed else mtime_ns,
+            "inodes": sorted(left_behind)
+        })
+        
+    def _iter_resume(self, journal, parallel, workers, progress):
+        """Finish an interrupted run from its journal, settling moves the files show were done"""
+        copied = self._clear_partials(journal)
+        rows = []
+        remaining = MovePlan(journal.header["action"], journal.directory)
+        remaining.inodes = set(journal.header["inodes"])
+        settled = []
+        target_dirs = set()
+        for row, (source, destination, info, size) in enumerate(journal.moves):
+            if row in journal.done:
+                continue
+            if os.path.exists(destination):
+                if not os.path.exists(source):
+                    settled.append((row, source, destination, info))
+                    continue
+                # Stopped between putting the new name in place and removing the old one
+                if destination in copied or os.path.samefile(source, destination):
+                    os.unlink(source)
+                    settled.append((row, source, destination, info))
+                    continue
+            rows.append(row)
+            remaining.moves.append((source, destination, info))
+            remaining.sizes.append(size)
+            target_dir = os.path.dirname(destination)
+            if target_dir not in target_dirs:
+                target_dirs.add(target_dir)
+                remaining.target_dirs.append(target_dir)
+        count("stat", 2 * (len(settled) + len(rows)))
+        
+        yield "resumed", {
+            "directory": journal.directory,
+            "planned": len(journal.moves),
+            "left": len(rows)
+        }
+        progress.start(len(settled))
+        for row, source, destination, info in settled:
+            journal.mark_row_done(row)
+            progress.advance()
+            yield "moved", {"from": source, "to": destination, **info}
+        
+        journal.rows = rows
+        failed = set()
+        for kind, item in self.iter_move_plan(remaining, parallel, workers, progress, journal):
+            if kind == "error":
+                failed.add(item["file"])
+            yield kind, item
+        if not progress.cancelled:
+            since = self.memory.get_watermark(journal.directory, journal.key)
+            self._record_watermark(journal.directory, journal.key, remaining, since, journal.header["started"], failed)
+        
+    def _clear_partials(self, journal):
+        """Delete an interrupted run's temporary copies; returns destinations already copied"""
+        names_by_dir = {}
+        for row, (source, destination, info, size) in enumerate(journal.moves):
+            if row not in journal.done:
+                target_dir, name = os.path.split(destination)
+                names_by_dir.setdefault(target_dir, set()).add(name)
+        
+        copied = set()
+        for target_dir, names in names_by_dir.items():
+            try:
+                partials = leftover_partials(target_dir, names)
+                count("listdir")
+            except OSError:
+                continue
+            for name, paths in partials.items():
+                destination = os.path.join(target_dir, name)
+                for path in paths:
+                    try:
+                        # Linked into place but not yet removed: the copy is complete
+                        if os.path.exists(destination) and os.path.samefile(path, destination):
+                            copied.add(destination)
+                        os.unlink(path)
+                    except OSError:
+                        continue
+        return copied
+        
+    def _iter_organize(self, directory, key, plan_moves, parallel, workers, progress):
+        """Plan, journal and apply an organize run, finishing an interrupted one by key first"""
+        journal = find_unfinished(directory, key, self.journal_dir)
+        if journal is not None:
+            yield from self._iter_resume(journal, parallel, workers, progress)
+            if progress.cancelled:
+                return
+        
+        since = self.memory.get_watermark(directory, key)
+        if self._unchanged(directory, since):
+            return
+        
+        started = time.time()
+        move_plan = plan_moves(since)
+        journal = MoveJournal.create(move_plan, key, self.journal_dir) if len(move_plan) else None
+        # Paths that could not be planned or moved, so the next run tries them again
+        failed = set()
+        for kind, item in self.iter_move_plan(move_plan, parallel, workers, progress, journal):
+            if kind == "error":
+                failed.add(item["file"])
+            yield kind, item
+        if not progress.cancelled:
+            self._record_watermark(directory, key, move_plan, since, started, failed)
+            prune(self.journal_dir)
+        
+    def _run_organize(self, directory, key, plan_moves, parallel, workers, progress):
+        """Collect an organize run into {"moved", "errors", "cancelled", "unchanged", "resumed"}"""
+        progress = progress or Progress()
+        results = {"moved": MoveResults(), "errors": [], "cancelled": False, "unchanged": False, "resumed": None}
+        for kind, item in self._iter_organize(directory, key, plan_moves, parallel, workers, progress):
+            if kind == "resumed":
+                results["resumed"] = item
+            else:
+                results["moved" if kind == "moved" else "errors"].append(item)
+        results["cancelled"] = progress.cancelled
+        results["unchanged"] = not results["moved"] and not results["errors"]
+        return results
+        
+    @span("execute.plan_organize_by_type")
+    def plan_organize_by_type(self, directory, since=None):
+        """Plan where every file in directory goes when organizing by type"""
+        records = self._scan(directory, since)
+        entries = []
+        sizes = []
+        for record in records:
+            file_type = get_file_type(record)
+            entries.append((record.path, os.path.join(directory, file_type), {"type": file_type}))
+            sizes.append(record.size)
+        
+        move_plan = build_move_plan("organize_by_type", directory, entries, sizes)
+        move_plan.inodes = {record.inode for record in records}
+        return move_plan
+        
+    @span("execute.plan_organize_by_date")
+    def plan_organize_by_date(self, directory, use_modified=True, since=None):
+        """Plan where every file in directory goes when organizing by date"""
+        records = self._scan(directory, since)
+        entries = []
+        sizes = []
+        errors = []
+        now = datetime.now()
+        for record in records:
+            try:
+                date_category = get_file_date_category(record, use_modified, now)
+                entries.append((record.path, os.path.join(directory, date_category), {"date_category": date_category}))
+                sizes.append(record.size)
+                
+            except Exception as e:
+                # Timestamps outside the platform's supported range
+                errors.append({
+                    "file": record.path,
+                    "error": str(e)
+                })
+        
+        move_plan = build_move_plan("organize_by_date", directory, entries, sizes)
+        move_plan.errors.extend(errors)
+        move_plan.inodes = {record.inode for record in records}
+        return move_plan
+        
+    @span("execute.plan_organize_by_size")
+    def plan_organize_by_size(self, directory, since=None):
+        """Plan where every file in directory goes when organizing by size"""
+        records = self._scan(directory, since)
+        entries = []
+        sizes = []
+        for record in records:
+            size_category = get_file_size_category(record)
+            entries.append((record.path, os.path.join(directory, size_category), {"size_category": size_category}))
+            sizes.append(record.size)
+        
+        move_plan = build_move_plan("organize_by_size", directory, entries, sizes)
+        move_plan.inodes = {record.inode for record in records}
+        return move_plan
+        
+    @span("execute.plan_organize_by_keys")
+    def plan_organize_by_keys(self, directory, keys, use_modified=True, since=None):
+        """Plan nested destinations such as pdf/2023 for several keys from one scan"""
+        unknown = [key for key in keys if key not in ORGANIZE_KEYS]
+        if unknown or not keys:
+            raise ValueError(f"Cannot organize by: {', '.join(unknown) or 'nothing'}")
+        
+        records = self._scan(directory, since)
+        entries = []
+        sizes = []
+        errors = []
+        now = datetime.now()
+        for record in records:
+            try:
+                info = {}
+                for key in keys:
+                    if key == "type":
+                        info["type"] = get_file_type(record)
+                    elif key == "date":
+                        info["date_category"] = get_file_date_category(record, use_modified, now)
+                    elif key == "size":
+                        info["size_category"] = get_file_size_category(record)
+                folders = list(info.values())
+                info["folder"] = os.path.join(*folders)
+                entries.append((record.path, os.path.join(directory, *folders), info))
+                sizes.append(record.size)
+                
+            except Exception as e:
+                # Timestamps outside the platform's supported range
+                errors.append({
+                    "file": record.path,
+                    "error": str(e)
+                })
+        
+        move_plan = build_move_plan("organize_by_keys", directory, entries, sizes)
+        move_plan.errors.extend(errors)
+        move_plan.inodes = {record.inode for record in records}
+        return move_plan
+        
+    def plan_moves(self, plan, since=None):
+        """Build the move plan for an organize plan from Planner.create_plan"""
+        if plan["action"] == "organize_by_type":
+            return self.plan_organize_by_type(plan["directory"], since)
+        elif plan["action"] == "organize_by_date":
+            return self.plan_organize_by_date(plan["directory"], plan["use_modified"], since)
+        elif plan["action"] == "organize_by_size":
+            return self.plan_organize_by_size(plan["directory"], since)
+        elif plan["action"] == "organize_by_keys":
+            return self.plan_organize_by_keys(plan["directory"], plan["keys"], plan["use_modified"], since)
+        raise ValueError(f"Not an organize action: {plan['action']}")
+        
+    def preview_moves(self, plan):
+        """The moves an organize plan would make, with the interrupted run it finishes first"""
+        directory = plan["directory"]
+        key = self._watermark_key(plan["action"], plan.get("use_modified", True), plan.get("keys"))
+        preview = MovePlan(plan["action"], directory)
+        
+        journal = find_unfinished(directory, key, self.journal_dir)
+        if journal is not None:
+            for row, (source, destination, info, size) in enumerate(journal.moves):
+                if row in journal.done or not os.path.exists(source):
+                    continue
+                if os.path.exists(destination) and os.path.samefile(source, destination):
+                    continue
+                preview.moves.append((source, destination, info))
+        
+        since = self.memory.get_watermark(directory, key)
+        if journal is None and self._unchanged(directory, since):
+            return preview
+        
+        move_plan = self.plan_moves(plan, since)
+        resumed = {source for source, _, _ in preview.moves}
+        preview.moves.extend(move for move in move_plan.moves if move[0] not in resumed)
+        preview.target_dirs = move_plan.target_dirs
+        preview.errors = move_plan.errors
+        preview.inodes = move_plan.inodes
+        return preview
+        
+    @span("execute.organize_by_type")
+    def organize_by_type(self, directory, parallel=False, workers=MOVE_WORKERS, progress=None):
+        """Organize files in directory by their type"""
+        try:
+            results = self._run_organize(
+                directory, self._watermark_key("organize_by_type"),
+                lambda since: self.plan_organize_by_type(directory, since), parallel, workers, progress
+            )
             
             # Log the action
             self.memory.add_action(
@@ -59,34 +434,14 @@ class Executor:
             )
             raise
             
-    def organize_by_date(self, directory, use_modified=True):
+    @span("execute.organize_by_date")
+    def organize_by_date(self, directory, use_modified=True, parallel=False, workers=MOVE_WORKERS, progress=None):
         """Organize files in directory by their date"""
-        results = {"moved": [], "errors": []}
-        
         try:
-            files = list_files_in_directory(directory)
-            
-            for file_path in files:
-                try:
-                    date_category = get_file_date_category(file_path, use_modified)
-                    date_dir = os.path.join(directory, date_category)
-                    safe_create_directory(date_dir)
-                    
-                    file_name = os.path.basename(file_path)
-                    destination = os.path.join(date_dir, file_name)
-                    moved_to = safe_move_file(file_path, destination)
-                    
-                    results["moved"].append({
-                        "from": file_path,
-                        "to": moved_to,
-                        "date_category": date_category
-                    })
-                    
-                except Exception as e:
-                    results["errors"].append({
-                        "file": file_path,
-                        "error": str(e)
-                    })
+            results = self._run_organize(
+                directory, self._watermark_key("organize_by_date", use_modified),
+                lambda since: self.plan_organize_by_date(directory, use_modified, since), parallel, workers, progress
+            )
             
             # Log the action
             self.memory.add_action(
@@ -110,16 +465,278 @@ class Executor:
             )
             raise
             
+    @span("execute.organize_by_size")
+    def organize_by_size(self, directory, parallel=False, workers=MOVE_WORKERS, progress=None):
+        """Organize files in directory by their size"""
+        try:
+            results = self._run_organize(
+                directory, self._watermark_key("organize_by_size"),
+                lambda since: self.plan_organize_by_size(directory, since), parallel, workers, progress
+            )
+            
+            # Log the action
+            self.memory.add_action(
+                "organize_by_size",
+                {
+                    "directory": directory,
+                    "files_moved": len(results["moved"]),
+                    "errors": len(results["errors"])
+                },
+                success=(len(results["errors"]) == 0)
+            )
+            
+            return results
+            
+        except Exception as e:
+            self.memory.add_action(
+                "organize_by_size",
+                {"directory": directory, "error": str(e)},
+                success=False
+            )
+            raise
+            
+    @span("execute.organize_by_keys")
+    def organize_by_keys(self, directory, keys, use_modified=True, parallel=False, workers=MOVE_WORKERS,
+                         progress=None):
+        """Organize files in directory into nested folders, one level per key"""
+        try:
+            results = self._run_organize(
+                directory, self._watermark_key("organize_by_keys", use_modified, keys),
+                lambda since: self.plan_organize_by_keys(directory, keys, use_modified, since), parallel, workers, progress
+            )
+            
+            # Log the action
+            self.memory.add_action(
+                "organize_by_keys",
+                {
+                    "directory": directory,
+                    "keys": list(keys),
+                    "use_modified": use_modified,
+                    "files_moved": len(results["moved"]),
+                    "errors": len(results["errors"])
+                },
+                success=(len(results["errors"]) == 0)
+            )
+            
+            return results
+            
+        except Exception as e:
+            self.memory.add_action(
+                "organize_by_keys",
+                {"directory": directory, "keys": list(keys), "error": str(e)},
+                success=False
+            )
+            raise
+            
+    @span("execute.undo_organize")
+    def undo_last_organize(self, directory=None, workers=MOVE_WORKERS, progress=None):
+        """Move the files of the last organize run back, newest move first"""
+        progress = progress or Progress()
+        results = {"restored": MoveResults(), "errors": [], "directory": directory, "action": None,
+                   "cancelled": False, "error": None}
+        
+        try:
+            journal = find_last(directory, self.journal_dir)
+            if journal is None:
+                results["error"] = "There is no organize run to undo"
+                return results
+            results["directory"] = journal.directory
+            results["action"] = journal.header["action"]
+            if journal.status == "running":
+                # An interrupted run is closed so it is not resumed afterwards
+                journal.complete()
+            
+            undo_plan = MovePlan("undo_organize", journal.directory)
+            source_dirs = set()
+            for row in reversed(range(len(journal.moves))):
+                source, destination, info, size = journal.moves[row]
+                moved = os.path.exists(destination)
+                back = os.path.exists(source)
+                if moved and back and os.path.samefile(source, destination):
+                    # Stopped between linking and unlinking; the old name is already back
+                    os.unlink(destination)
+                    results["restored"].append({"from": destination, "to": source, **info})
+                elif moved and back:
+                    results["errors"].append({"file": destination, "error": f"Another file now has its old name, {source}"})
+                elif moved:
+                    undo_plan.moves.append((destination, source, info))
+                    undo_plan.sizes.append(size)
+                    source_dir = os.path.dirname(source)
+                    if source_dir not in source_dirs:
+                        source_dirs.add(source_dir)
+                        undo_plan.target_dirs.append(source_dir)
+                elif not back and row in journal.done:
+                    results["errors"].append({"file": destination, "error": "No longer where it was moved to"})
+            count("stat", 2 * len(journal.moves))
+            
+            # A file may take an old name while undo runs, so moves never replace
+            for kind, item in self.iter_move_plan(undo_plan, True, workers, progress, rename_on_conflict=False):
+                if kind == "moved":
+                    results["restored"].append(item)
+                else:
+                    results["errors"].append(item)
+            results["cancelled"] = progress.cancelled
+            
+            if not results["cancelled"]:
+                # Deepest first, and only those left empty
+                for created in sorted(journal.created_dirs, key=len, reverse=True):
+                    try:
+                        os.rmdir(created)
+                    except OSError:
+                        continue
+                # A failed file can be retried by undoing again
+                if not results["errors"]:
+                    journal.mark_undone()
+            
+            self.memory.add_action(
+                "undo_organize",
+                {
+                    "directory": journal.directory,
+                    "undone_action": journal.header["action"],
+                    "files_restored": len(results["restored"]),
+                    "errors": len(results["errors"])
+                },
+                success=(len(results["errors"]) == 0)
+            )
+            
+            return results
+            
+        except Exception as e:
+            self.memory.add_action(
+                "undo_organize",
+                {"directory": directory, "error": str(e)},
+                success=False
+            )
+            results["error"] = str(e)
+            return results
+            
+    @span("execute.apply_move_plan")
+    def apply_move_plan(self, move_plan, parallel=False, workers=MOVE_WORKERS, progress=None):
+        """Carry out a MovePlan into {"moved", "errors", "cancelled"}; moved is a MoveResults"""
+        progress = progress or Progress()
+        results = {"moved": MoveResults(), "errors": [], "cancelled": False}
+        for kind, item in self.iter_move_plan(move_plan, parallel, workers, progress):
+            results["moved" if kind == "moved" else "errors"].append(item)
+        results["cancelled"] = progress.cancelled
+        return results
+        
+    def iter_move_plan(self, move_plan, parallel=False, workers=MOVE_WORKERS, progress=None, journal=None,
+                       rename_on_conflict=True):
+        """Carry out a MovePlan, yielding ("moved" or "error", item) per file"""
+        progress = progress or Progress()
+        progress.start(len(move_plan), move_plan.total_bytes())
+        for error in move_plan.errors:
+            yield "error", error
+        
+        failed_dirs = {}
+        devices = {}
+        # Directories the planner found missing are not looked up again
+        missing = [target_dir for target_dir in move_plan.target_dirs if target_dir in move_plan.new_dirs]
+        for target_dir in move_plan.target_dirs:
+            if target_dir in move_plan.new_dirs:
+                continue
+            try:
+                target_stat = os.stat(target_dir)
+            except FileNotFoundError:
+                missing.append(target_dir)
+                continue
+            except OSError as e:
+                failed_dirs[target_dir] = str(e)
+                continue
+            if stat.S_ISDIR(target_stat.st_mode):
+                devices[target_dir] = target_stat.st_dev
+            else:
+                failed_dirs[target_dir] = f"Not a directory: {target_dir}"
+        
+        if journal is not None:
+            journal.record_created_dirs(_missing_dirs(missing))
+        for target_dir in missing:
+            try:
+                safe_create_directory(target_dir)
+                count("mkdir")
+                devices[target_dir] = os.stat(target_dir).st_dev
+            except Exception as e:
+                failed_dirs[target_dir] = str(e)
+        
+        renames = []
+        copies = []
+        moves = zip(move_plan.moves, move_plan.sizes or repeat(0))
+        for position, ((source, destination, info), size) in enumerate(moves):
+            target_dir = os.path.dirname(destination)
+            if target_dir in failed_dirs:
+                progress.advance(error=True)
+                yield "error", {"file": source, "error": failed_dirs[target_dir]}
+                continue
+            
+            source_dir = os.path.dirname(source)
+            if source_dir not in devices:
+                try:
+                    devices[source_dir] = os.stat(source_dir).st_dev
+                except OSError as e:
+                    progress.advance(error=True)
+                    yield "error", {"file": source, "error": str(e)}
+                    continue
+            if devices[source_dir] == devices[target_dir]:
+                renames.append((position, source, destination, info, size))
+            else:
+                copies.append((position, source, destination, info, size))
+        count("rename", len(renames))
+        count("copy", len(copies))
+        
+        def run(move, same_device):
+            position, source, destination, info, size = move
+            try:
+                while True:
+                    try:
+                        return move, move_file(source, destination, same_device), None
+                    except FileExistsError:
+                        # Someone took the planned name since; never replace their file
+                        count("conflict")
+                        if not rename_on_conflict:
+                            return move, None, f"Another file now has the name {destination}"
+                        destination = free_destination(destination)
+                        if journal is not None:
+                            # Written first, so resume and undo look for the file there
+                            journal.redirect(position, destination)
+            except Exception as e:
+                return move, None, str(e)
+        
+        rename_workers = workers if parallel and len(renames) > 1 else 1
+        # Copies wait on I/O, so they always overlap
+        copy_workers = COPY_WORKERS if len(copies) > 1 else 1
+        outcomes = chain(
+            _completed(lambda move: run(move, True), renames, rename_workers, progress),
+            _completed(lambda move: run(move, False), copies, copy_workers, progress)
+        )
+        
+        moved = 0
+        try:
+            for (position, source, _, info, size), moved_to, error in outcomes:
+                if error is None:
+                    moved += 1
+                    if journal is not None:
+                        journal.mark_done(position)
+                    progress.advance(bytes_done=size)
+                    yield "moved", {"from": source, "to": moved_to, **info}
+                else:
+                    progress.advance(error=True)
+                    yield "error", {"file": source, "error": error}
+            if journal is not None and not progress.cancelled:
+                journal.complete()
+        finally:
+            # Also when the consumer stops early, so resume redoes as little as possible
+            if journal is not None:
+                journal.checkpoint()
+        count("move", moved)
+        progress.finish()
+            
+    @span("execute.find_files_by_type")
     def find_files_by_type(self, directory, file_type):
         """Find all files of a specific type"""
         results = {"found": [], "error": None}
         
         try:
-            files = list_files_in_directory(directory)
-            
-            for file_path in files:
-                if get_file_type(file_path) == file_type:
-                    results["found"].append(file_path)
+            results["found"] = self.index.find_by_extension(directory, file_type)
             
             # Log the action
             self.memory.add_action(
@@ -145,19 +762,14 @@ class Executor:
     
     # Add this method to your Executor class in agent/execution.py
 
+    @span("execute.find_file_by_name")
     def find_file_by_name(self, directory, file_name):
         """Find files that match a full or partial name"""
         results = {"found": [], "error": None}
         
         try:
-            all_files = []
-            
-            # Walk through directory including subdirectories
-            for root, _, files in os.walk(directory):
-                for file in files:
-                    if file_name.lower() in file.lower():
-                        file_path = os.path.join(root, file)
-                        results["found"].append(file_path)
+            # Answered from the index, which only relists changed directories
+            results["found"] = self.index.find_by_name(directory, file_name)
             
             # Log the action
             self.memory.add_action(
@@ -179,4 +791,186 @@ class Executor:
                 success=False
             )
             results["error"] = str(e)
-            return results
\ No newline at end of file
+            return results
+
+    @span("execute.find_file_fuzzy")
+    def find_file_fuzzy(self, directory, file_name, limit=FUZZY_TOP_K):
+        """Find the files whose names are closest to a possibly misspelled name"""
+        results = {"found": [], "distances": [], "error": None}
+        
+        try:
+            # Short queries tolerate fewer typos, or everything would match
+            max_distance = min(FUZZY_MAX_DISTANCE, max(1, len(file_name) // 3))
+            candidates = self.index.fuzzy_candidates(directory, file_name, FUZZY_CANDIDATES)
+            
+            for path, distance in rank_matches(file_name, candidates, max_distance, limit):
+                results["found"].append(path)
+                results["distances"].append(distance)
+            
+            # Log the action
+            self.memory.add_action(
+                "find_file_fuzzy",
+                {
+                    "directory": directory,
+                    "file_name": file_name,
+                    "files_found": len(results["found"])
+                },
+                success=True
+            )
+            
+            return results
+            
+        except Exception as e:
+            self.memory.add_action(
+                "find_file_fuzzy",
+                {"directory": directory, "file_name": file_name, "error": str(e)},
+                success=False
+            )
+            results["error"] = str(e)
+            return results
+
+    @span("execute.find_files")
+    def find_files(self, directory, filters, progress=None):
+        """Find files matching combined filters (name, type, size, date, depth, limit)"""
+        results = {"found": [], "truncated": False, "description": "", "cancelled": False, "error": None}
+        progress = progress or Progress()
+        
+        try:
+            query = FileQuery.from_filters(filters)
+            results["description"] = query.describe()
+            
+            found = []
+            for path in self._iter_matching(directory, query):
+                found.append(path)
+                progress.advance()
+                if progress.cancelled:
+                    break
+            progress.finish()
+            
+            results["found"] = sorted(found)
+            results["truncated"] = query.limit is not None and len(found) >= query.limit
+            results["cancelled"] = progress.cancelled
+            
+            # Log the action
+            self.memory.add_action(
+                "find_files",
+                {
+                    "directory": directory,
+                    "filters": filters,
+                    "files_found": len(results["found"])
+                },
+                success=True
+            )
+            
+            return results
+            
+        except Exception as e:
+            self.memory.add_action(
+                "find_files",
+                {"directory": directory, "filters": filters, "error": str(e)},
+                success=False
+            )
+            results["error"] = str(e)
+            return results
+            
+    def _iter_matching(self, directory, query):
+        """Paths matching a FileQuery, from the index if directory is watched"""
+        if self.index.is_watched(directory):
+            conditions, parameters = query.sql_conditions(os.path.abspath(directory))
+            return iter(self.index.find_matching(directory, conditions, parameters, query.limit))
+        return query.walk(directory)
+        
+    def stream(self, plan, progress=None):
+        """Run a plan from Planner.create_plan, yielding (kind, item) for each file as it is done"""
+        action = plan["action"]
+        directory = plan["directory"]
+        progress = progress or Progress()
+        details = {"directory": directory}
+        totals = {"moved": 0, "found": 0, "error": 0, "resumed": 0}
+        failed = False
+        finished = False
+        
+        with span(f"execute.{action}"):
+            try:
+                if action in ("organize_by_type", "organize_by_date", "organize_by_size", "organize_by_keys"):
+                    details.update({key: plan[key] for key in ("use_modified", "keys") if key in plan})
+                    events = self._iter_organize(
+                        directory, self._watermark_key(action, plan.get("use_modified", True), plan.get("keys")),
+                        lambda since: self.plan_moves(plan, since), plan["parallel"], plan["workers"], progress
+                    )
+                elif action == "find_files_by_type":
+                    details["file_type"] = plan["file_type"]
+                    events = _found(self.index.find_by_extension(directory, plan["file_type"]), progress)
+                elif action == "find_file_by_name":
+                    details["file_name"] = plan["file_name"]
+                    events = _found(self.index.find_by_name(directory, plan["file_name"]), progress)
+                elif action == "find_files":
+                    details["filters"] = plan["filters"]
+                    events = _found(self._iter_matching(directory, FileQuery.from_filters(plan["filters"])), progress)
+                else:
+                    raise ValueError(f"Cannot stream {action}")
+                
+                for kind, item in events:
+                    totals[kind] += 1
+                    yield kind, item
+                finished = True
+                    
+            except Exception as e:
+                failed = True
+                self.memory.add_action(action, {**details, "error": str(e)}, success=False)
+                raise
+            
+            finally:
+                # Also logged when the consumer stops early, e.g. on Ctrl+C
+                if not failed:
+                    if action.startswith("organize"):
+                        details.update({"files_moved": totals["moved"], "errors": totals["error"]})
+                        if totals["resumed"]:
+                            details["resumed"] = True
+                    else:
+                        details["files_found"] = totals["found"]
+                    if progress.cancelled or not finished:
+                        details["cancelled"] = True
+                    self.memory.add_action(action, details, success=(totals["error"] == 0))
+        
+    @span("execute.find_duplicates")
+    def find_duplicates(self, directory, min_size=DUPLICATE_MIN_SIZE, workers=DUPLICATE_WORKERS):
+        """Find groups of files with identical content anywhere below directory"""
+        results = {"groups": [], "wasted_bytes": 0, "errors": [], "error": None}
+        
+        try:
+            # Sizes from one fresh walk; only files sharing one can be duplicates
+            groups, stats, errors = find_duplicate_groups(scan_sizes(directory, min_size), workers)
+            count("hash_partial", stats["partial_hashed"])
+            count("hash_full", stats["full_hashed"])
+            
+            for group in groups:
+                results["groups"].append({
+                    "size": group[0].size,
+                    "files": [record.path for record in group]
+                })
+                results["wasted_bytes"] += group[0].size * (len(group) - 1)
+            results["errors"] = errors
+            
+            # Log the action
+            self.memory.add_action(
+                "find_duplicates",
+                {
+                    "directory": directory,
+                    "groups_found": len(results["groups"]),
+                    "wasted_bytes": results["wasted_bytes"],
+                    "files_hashed": stats["full_hashed"]
+                },
+                success=True
+            )
+            
+            return results
+            
+        except Exception as e:
+            self.memory.add_action(
+                "find_duplicates",
+                {"directory": directory, "error": str(e)},
+                success=False
+            )
+            results["error"] = str(e)
+            return results
@@ -0,0 +1,388 @@
+import os
+import sqlite3
+import stat
+import threading
+from config import INDEX_FILE, WALK_WORKERS
+from agent.instrumentation import count
+from agent.utils.file_helpers import FileRecord, get_file_type
+from agent.utils.walker import parallel_walk, SKIP
+
+# Bump when the schema changes; the index is a cache and is rebuilt on mismatch
+SCHEMA_VERSION = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS directories (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime_ns INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_directories_parent ON directories(parent);
+
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    directory TEXT NOT NULL,
+    name TEXT NOT NULL,
+    name_lower TEXT NOT NULL,
+    extension TEXT NOT NULL,
+    size INTEGER,
+    mtime REAL,
+    ctime REAL,
+    inode INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_files_directory_extension ON files(directory, extension);
+CREATE INDEX IF NOT EXISTS idx_files_name_lower ON files(name_lower);
+CREATE INDEX IF NOT EXISTS idx_files_size ON files(size);
+
+-- Trigram inverted index over lowercased names, maintained by triggers
+CREATE TABLE IF NOT EXISTS trigrams (
+    gram TEXT NOT NULL,
+    file_id INTEGER NOT NULL,
+    PRIMARY KEY (gram, file_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_trigrams_file_id ON trigrams(file_id);
+
+-- Character offsets used to slice names into trigrams inside the triggers
+CREATE TABLE IF NOT EXISTS offsets (n INTEGER PRIMARY KEY);
+
+CREATE TRIGGER IF NOT EXISTS files_trigrams_insert AFTER INSERT ON files BEGIN
+    INSERT OR IGNORE INTO trigrams (gram, file_id)
+    SELECT substr(NEW.name_lower, n + 1, 3), NEW.id FROM offsets
+    WHERE n <= length(NEW.name_lower) - 3;
+END;
+
+CREATE TRIGGER IF NOT EXISTS files_trigrams_delete AFTER DELETE ON files BEGIN
+    DELETE FROM trigrams WHERE file_id = OLD.id;
+END;
+"""
+
+# Longest name, in characters, that gets fully indexed
+MAX_INDEXED_NAME = 1024
+
+# Query strings shorter than this cannot use the trigram index
+GRAM = 3
+
+INSERT_FILE = (
+    "INSERT OR REPLACE INTO files "
+    "(path, directory, name, name_lower, extension, size, mtime, ctime, inode) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+def _row(record):
+    """Column values for a FileRecord"""
+    return (
+        record.path, os.path.dirname(record.path), record.name, record.name.lower(),
+        get_file_type(record.name), record.size, record.mtime, record.ctime, record.inode
+    )
+
+def _subtree_bounds(directory):
+    """Return the [low, high) path range covering everything below directory"""
+    prefix = os.path.join(directory, "")
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+class FileIndex:
+    def __init__(self, db_path=INDEX_FILE, workers=WALK_WORKERS):
+        self.db_path = db_path
+        # Threads listing directories during a recursive refresh
+        self.workers = workers
+        # Shared with the workspace watcher thread, so access is serialized
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        # INSERT OR REPLACE must fire the delete trigger for replaced rows
+        self.connection.execute("PRAGMA recursive_triggers = ON")
+        self.lock = threading.RLock()
+        # Watched root -> the watcher's flush, which commits its pending events
+        self.watched_roots = {}
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        """Create the tables, dropping an index built by an older schema"""
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self.connection.executescript(
+                "DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS directories; "
+                "DROP TABLE IF EXISTS trigrams; DROP TABLE IF EXISTS offsets;"
+            )
+        self.connection.executescript(SCHEMA)
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO offsets (n) VALUES (?)",
+            ((n,) for n in range(MAX_INDEXED_NAME))
+        )
+        self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.connection.commit()
+
+    def close(self):
+        """Close the database connection"""
+        with self.lock:
+            self.connection.close()
+
+    def mark_watched(self, root, flush):
+        """Trust the index for root; a watcher keeps it current and commits on flush()"""
+        with self.lock:
+            self.watched_roots[os.path.abspath(root)] = flush
+
+    def unmark_watched(self, root):
+        """Go back to mtime-based refreshes for root"""
+        with self.lock:
+            self.watched_roots.pop(os.path.abspath(root), None)
+
+    def _watcher_flush(self, directory):
+        """The flush of the watcher covering directory, or None if it is not watched"""
+        directory = os.path.abspath(directory)
+        for root, flush in list(self.watched_roots.items()):
+            if directory == root or directory.startswith(os.path.join(root, "")):
+                return flush
+        return None
+
+    def is_watched(self, directory):
+        """Check whether directory lies inside a watched root"""
+        return self._watcher_flush(directory) is not None
+
+    def refresh(self, directory, recursive=False):
+        """Bring the index for directory up to date.
+
+        Only directories whose mtime changed since the last visit are listed
+        again; unchanged directories cost a single stat. For watched
+        directories the watcher first commits its pending events; a recursive
+        refresh then trusts the index, while a single directory still gets its
+        stat to catch events the observer has not delivered yet.
+        """
+        directory = os.path.abspath(directory)
+        # Outside the lock: the watcher takes it to apply the batch
+        flush = self._watcher_flush(directory)
+        if flush is not None:
+            flush()
+            if recursive:
+                return
+        with self.lock:
+            if not os.path.isdir(directory):
+                raise FileNotFoundError(f"Directory not found: {directory}")
+            self._refresh(directory, recursive)
+            self.connection.commit()
+
+    def _refresh(self, directory, recursive):
+        """Walk directory and relist every directory whose mtime changed.
+
+        Directories are stat'ed and listed on the walker threads against the
+        recorded mtimes read up front; all writes happen on this thread.
+        """
+        if recursive:
+            low, high = _subtree_bounds(directory)
+            rows = self.connection.execute(
+                "SELECT path, parent, mtime_ns FROM directories "
+                "WHERE path = ? OR (path >= ? AND path < ?)",
+                (directory, low, high)
+            )
+        else:
+            rows = self.connection.execute(
+                "SELECT path, parent, mtime_ns FROM directories WHERE path = ? OR parent = ?",
+                (directory, directory)
+            )
+        recorded = {}
+        children = {}
+        for path, parent, mtime_ns in rows:
+            recorded[path] = mtime_ns
+            children.setdefault(parent, []).append(path)
+
+        def expand(current, depth):
+            try:
+                mtime_ns = os.stat(current).st_mtime_ns
+                count("stat")
+            except OSError:
+                return (current, None, None), []
+
+            if recorded.get(current) != mtime_ns:
+                files, subdirectories = self._list_directory(current)
+                result = (current, mtime_ns, (files, subdirectories))
+            else:
+                result, subdirectories = SKIP, children.get(current, [])
+            return result, subdirectories if recursive else []
+
+        for current, mtime_ns, listing in parallel_walk(directory, expand, self.workers if recursive else 1):
+            if listing is None:
+                self._forget_directory(current)
+            else:
+                self._store_listing(current, mtime_ns, *listing)
+
+    def _list_directory(self, directory):
+        """Index rows for the files in a directory, and its subdirectories"""
+        rows = []
+        subdirectories = []
+
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(entry.path)
+                    elif entry.is_file():
+                        rows.append(_row(FileRecord.from_entry(entry)))
+                except OSError:
+                    # The entry vanished between listing and stat
+                    continue
+
+        count("listdir")
+        count("stat", len(rows))
+        return rows, subdirectories
+
+    def _store_listing(self, directory, mtime_ns, rows, subdirectories):
+        """Replace a directory's index entries with a fresh listing"""
+        self.connection.execute("DELETE FROM files WHERE directory = ?", (directory,))
+        self.connection.executemany(INSERT_FILE, rows)
+
+        # Drop subdirectories that no longer exist, register new ones unscanned
+        known = {r[0] for r in self.connection.execute(
+            "SELECT path FROM directories WHERE parent = ?", (directory,)
+        )}
+        for removed in known.difference(subdirectories):
+            self._forget_directory(removed)
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO directories (path, parent, mtime_ns) VALUES (?, ?, NULL)",
+            [(path, directory) for path in subdirectories if path not in known]
+        )
+
+        self.connection.execute(
+            "INSERT INTO directories (path, parent, mtime_ns) VALUES (?, ?, ?) "
+            "ON CONFLICT(path) DO UPDATE SET mtime_ns = excluded.mtime_ns",
+            (directory, os.path.dirname(directory), mtime_ns)
+        )
+
+    def apply_changes(self, synced_paths, deleted_paths):
+        """Apply a batch of filesystem events in one transaction.
+
+        Deleted paths are dropped together with anything below them. Synced
+        paths are looked up on disk: files are upserted, directories are
+        indexed recursively and paths that have disappeared are dropped.
+        """
+        with self.lock:
+            for path in deleted_paths:
+                self._forget_path(path)
+
+            rows = []
+            for path in synced_paths:
+                try:
+                    stat_result = os.stat(path)
+                except OSError:
+                    self._forget_path(path)
+                    continue
+
+                if stat.S_ISDIR(stat_result.st_mode):
+                    self.connection.execute(
+                        "INSERT OR IGNORE INTO directories (path, parent, mtime_ns) VALUES (?, ?, NULL)",
+                        (path, os.path.dirname(path))
+                    )
+                    self._refresh(path, recursive=True)
+                else:
+                    rows.append(_row(FileRecord(
+                        path, os.path.basename(path), stat_result.st_size,
+                        stat_result.st_mtime, stat_result.st_ctime, stat_result.st_ino
+                    )))
+
+            self.connection.executemany(INSERT_FILE, rows)
+            self.connection.commit()
+
+    def _forget_path(self, path):
+        """Remove a file or a whole directory subtree from the index"""
+        self.connection.execute("DELETE FROM files WHERE path = ?", (path,))
+        self._forget_directory(path)
+
+    def _forget_directory(self, directory):
+        """Remove a directory and everything below it from the index"""
+        low, high = _subtree_bounds(directory)
+        self.connection.execute("DELETE FROM files WHERE path >= ? AND path < ?", (low, high))
+        self.connection.execute("DELETE FROM directories WHERE path = ?", (directory,))
+        self.connection.execute("DELETE FROM directories WHERE path >= ? AND path < ?", (low, high))
+
+    def file_records(self, directory):
+        """Return FileRecords for the files directly inside directory"""
+        directory = os.path.abspath(directory)
+        self.refresh(directory)
+        with self.lock:
+            return [FileRecord(*row) for row in self.connection.execute(
+                "SELECT path, name, size, mtime, ctime, inode FROM files "
+                "WHERE directory = ? ORDER BY path",
+                (directory,)
+            )]
+
+    def find_by_extension(self, directory, extension):
+        """Return files directly inside directory with the given extension"""
+        directory = os.path.abspath(directory)
+        self.refresh(directory)
+        with self.lock:
+            return [r[0] for r in self.connection.execute(
+                "SELECT path FROM files WHERE directory = ? AND extension = ? ORDER BY path",
+                (directory, extension)
+            )]
+
+    def find_by_name(self, directory, file_name):
+        """Return files anywhere below directory whose name contains file_name"""
+        directory = os.path.abspath(directory)
+        self.refresh(directory, recursive=True)
+        low, high = _subtree_bounds(directory)
+        needle = file_name.lower()
+
+        if len(needle) < GRAM:
+            query = (
+                "SELECT path FROM files WHERE path >= ? AND path < ? "
+                "AND instr(name_lower, ?) > 0 ORDER BY path"
+            )
+            parameters = (low, high, needle)
+        else:
+            # Intersect the posting lists, then verify only the candidates
+            grams = sorted({needle[i:i + GRAM] for i in range(len(needle) - GRAM + 1)})
+            postings = " INTERSECT ".join(
+                ["SELECT file_id FROM trigrams WHERE gram = ?"] * len(grams)
+            )
+            query = (
+                f"SELECT path FROM files WHERE id IN ({postings}) "
+                "AND path >= ? AND path < ? AND instr(name_lower, ?) > 0 ORDER BY path"
+            )
+            parameters = (*grams, low, high, needle)
+
+        with self.lock:
+            return [r[0] for r in self.connection.execute(query, parameters)]
+
+    def find_matching(self, directory, conditions, parameters, limit=None):
+        """Return paths anywhere below directory meeting SQL conditions on the files table"""
+        directory = os.path.abspath(directory)
+        self.refresh(directory, recursive=True)
+        low, high = _subtree_bounds(directory)
+
+        query = f"SELECT path FROM files WHERE {' AND '.join(['path >= ?', 'path < ?'] + conditions)} ORDER BY path"
+        parameters = [low, high] + list(parameters)
+        if limit is not None:
+            query += " LIMIT ?"
+            parameters.append(limit)
+
+        with self.lock:
+            return [r[0] for r in self.connection.execute(query, parameters)]
+
+    def fuzzy_candidates(self, directory, file_name, limit):
+        """Return (path, name_lower, shared trigrams) for names that may be close to file_name.
+
+        Names sharing the most trigrams with the query come first, so an
+        edit-distance check only has to look at a bounded candidate set.
+        """
+        directory = os.path.abspath(directory)
+        self.refresh(directory, recursive=True)
+        low, high = _subtree_bounds(directory)
+        needle = file_name.lower()
+        grams = sorted({needle[i:i + GRAM] for i in range(len(needle) - GRAM + 1)})
+
+        if not grams:
+            query = (
+                "SELECT path, name_lower, 0 FROM files WHERE path >= ? AND path < ? "
+                "ORDER BY length(name_lower) LIMIT ?"
+            )
+            parameters = (low, high, limit)
+        else:
+            placeholders = ", ".join("?" * len(grams))
+            query = (
+                "SELECT f.path, f.name_lower, c.shared FROM ("
+                f"SELECT file_id, COUNT(*) AS shared FROM trigrams WHERE gram IN ({placeholders}) "
+                "GROUP BY file_id"
+                ") c JOIN files f ON f.id = c.file_id "
+                "WHERE f.path >= ? AND f.path < ? ORDER BY c.shared DESC LIMIT ?"
+            )
+            parameters = (*grams, low, high, limit)
+
+        with self.lock:
+            return self.connection.execute(query, parameters).fetchall()
\ No newline at end of file
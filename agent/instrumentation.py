@@ -0,0 +1,195 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from config import METRICS_FILE, METRICS_KEEP
+
+# Samples kept per span name for the percentiles in Metrics.summary()
+SPAN_WINDOW = 500
+
+# Trace of the command being handled on this thread or task, if any
+_current_trace = ContextVar("current_trace", default=None)
+
+def current_trace():
+    """The active Trace, or None outside Metrics.trace()"""
+    return _current_trace.get()
+
+@contextmanager
+def span(name):
+    """Time a block as one span of the active trace; a no-op without one.
+
+    Also usable as a decorator, e.g. @span("plan").
+    """
+    trace = current_trace()
+    if trace is None:
+        yield
+        return
+    token = trace.open_span(name)
+    try:
+        yield
+    finally:
+        trace.close_span(token)
+
+def count(name, amount=1):
+    """Add to a per-command counter such as stat, mkdir or move"""
+    trace = current_trace()
+    if trace is not None:
+        trace.count(name, amount)
+
+def percentile(samples, fraction):
+    """The sample at fraction (0 to 1) of the way through the sorted samples"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class Trace:
+    """Spans and counters recorded while handling one command.
+
+    Spans can also be added from other threads, e.g. the LLM request
+    finishing on the Gemini client loop.
+    """
+
+    def __init__(self, name, attributes=None):
+        self.name = name
+        self.attributes = attributes or {}
+        self.started = time.perf_counter()
+        self.timestamp = datetime.now().isoformat()
+        self.lock = threading.Lock()
+        self.spans = []
+        self.counters = {}
+        # token -> (name, start) for spans still running
+        self.open_spans = {}
+        self.next_token = 0
+        self.total = None
+
+    def open_span(self, name):
+        with self.lock:
+            self.next_token += 1
+            self.open_spans[self.next_token] = (name, time.perf_counter())
+            return self.next_token
+
+    def close_span(self, token):
+        with self.lock:
+            name, started = self.open_spans.pop(token)
+            self.spans.append((name, time.perf_counter() - started))
+
+    def add_span(self, name, seconds):
+        """A span timed elsewhere"""
+        with self.lock:
+            self.spans.append((name, seconds))
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    def to_dict(self):
+        """Plain dict of the trace; spans still running report their time so far"""
+        now = time.perf_counter()
+        with self.lock:
+            spans = [{"name": name, "ms": round(1000 * seconds, 3)} for name, seconds in self.spans]
+            spans.extend(
+                {"name": name, "ms": round(1000 * (now - started), 3), "running": True}
+                for name, started in self.open_spans.values()
+            )
+            total = self.total if self.total is not None else now - self.started
+            return {
+                "name": self.name,
+                "timestamp": self.timestamp,
+                "attributes": dict(self.attributes),
+                "total_ms": round(1000 * total, 3),
+                "spans": spans,
+                "counters": dict(self.counters)
+            }
+
+class Metrics:
+    """Collects finished traces, aggregates them and appends them to a metrics file.
+
+    The file holds one JSON trace per line, ready to be shipped to a dashboard.
+    """
+
+    def __init__(self, metrics_file=METRICS_FILE, keep=METRICS_KEEP):
+        self.metrics_file = metrics_file
+        self.keep = keep
+        # Lines in the metrics file, counted on the first write
+        self.lines = None
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.counters = {}
+        self.traces = 0
+        self.last_trace = None
+
+    @contextmanager
+    def trace(self, name, **attributes):
+        """Record the spans and counters of one command"""
+        trace = Trace(name, attributes)
+        token = _current_trace.set(trace)
+        try:
+            yield trace
+        finally:
+            _current_trace.reset(token)
+            trace.finish()
+            self.record(trace)
+
+    def record(self, trace):
+        """Add a finished trace to the aggregates and the metrics file"""
+        data = trace.to_dict()
+        with self.lock:
+            self.traces += 1
+            self.last_trace = data
+            self.samples.setdefault(trace.name, deque(maxlen=SPAN_WINDOW)).append(data["total_ms"])
+            for item in data["spans"]:
+                self.samples.setdefault(item["name"], deque(maxlen=SPAN_WINDOW)).append(item["ms"])
+            for name, amount in data["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + amount
+
+        if self.metrics_file:
+            try:
+                with self.lock:
+                    self._append(json.dumps(data) + "\n")
+            except OSError as e:
+                print(f"Error writing metrics: {str(e)}")
+
+    def _append(self, line):
+        """Append a line to the metrics file, trimming it to the newest keep traces when full"""
+        if self.lines is None:
+            try:
+                with open(self.metrics_file, 'rb') as f:
+                    self.lines = sum(1 for _ in f)
+            except FileNotFoundError:
+                self.lines = 0
+
+        if self.keep and self.lines >= 2 * self.keep:
+            with open(self.metrics_file, 'rb') as f:
+                newest = deque(f, maxlen=self.keep - 1)
+            temp_file = self.metrics_file + ".tmp"
+            with open(temp_file, 'wb') as f:
+                f.writelines(newest)
+            os.replace(temp_file, self.metrics_file)
+            self.lines = len(newest)
+
+        with open(self.metrics_file, 'a') as f:
+            f.write(line)
+        self.lines += 1
+
+    def summary(self):
+        """Latency percentiles per span name and counter totals since start"""
+        with self.lock:
+            return {
+                "traces": self.traces,
+                "spans": {
+                    name: {
+                        "count": len(samples),
+                        "mean_ms": sum(samples) / len(samples),
+                        "p50_ms": percentile(samples, 0.5),
+                        "p95_ms": percentile(samples, 0.95),
+                    }
+                    for name, samples in sorted(self.samples.items()) if samples
+                },
+                "counters": dict(sorted(self.counters.items()))
+            }
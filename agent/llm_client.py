@@ -0,0 +1,76 @@
+import asyncio
+import threading
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+from config import GOOGLE_API_KEY, GEMINI_MODEL, LLM_TIMEOUT, LLM_RETRIES, LLM_BACKOFF
+
+# Errors worth another attempt; anything else (bad key, bad request) fails at once
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.ResourceExhausted,
+)
+
+class GeminiClient:
+    """Process-wide Gemini model running requests on its own event loop.
+
+    The model is configured once, and every request goes through the same
+    loop thread, so callers on any thread or event loop can share it.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        """The client for this process, created on first use"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def __init__(self, model_name=GEMINI_MODEL, timeout=LLM_TIMEOUT, retries=LLM_RETRIES, backoff=LLM_BACKOFF):
+        genai.configure(api_key=GOOGLE_API_KEY)
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="gemini-client", daemon=True)
+        self.thread.start()
+
+    async def _generate(self, prompt):
+        """Send one prompt with a deadline, retrying transient failures with backoff"""
+        attempt = 0
+        while True:
+            try:
+                response = await asyncio.wait_for(
+                    self.model.generate_content_async(prompt), self.timeout
+                )
+                return response.text
+            except RETRYABLE_ERRORS:
+                if attempt >= self.retries:
+                    raise
+                await asyncio.sleep(self.backoff * (2 ** attempt))
+                attempt += 1
+
+    def submit(self, coroutine):
+        """Run a coroutine on the client loop and return a concurrent Future"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def generate(self, prompt):
+        """Start a request in the background; returns a concurrent Future of the reply text"""
+        return self.submit(self._generate(prompt))
+
+    async def generate_async(self, prompt):
+        """Await a reply from any event loop"""
+        return await asyncio.wrap_future(self.generate(prompt))
+
+    def close(self):
+        """Stop the loop thread"""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
\ No newline at end of file
@@ -0,0 +1,294 @@
+import os
+import re
+
+ORGANIZE_WORDS = r"\b(organi[sz]e|sort|arrange|group|tidy|clean up|categori[sz]e)\b"
+FIND_WORDS = r"\b(find|search|locate|look for|looking for|show me|list|where (?:is|are))\b"
+
+BY_TYPE = r"\bby (?:file )?(?:type|types|extension|extensions|kind|format)\b"
+BY_DATE = r"\bby (?:the )?(?:date|dates|day|month|year|age|time|modification|modified|creation|created|last modified)\b"
+BY_SIZE = r"\bby (?:file )?(?:size|sizes|how big)\b"
+KEY_LEAD = r"(?:\bby |(?:,|\band|\bthen|&)\s+(?:by )?)"
+CREATED = r"\b(created|creation|create date|date created)\b"
+DUPLICATE_WORDS = r"\b(duplicates?|duplicated|dupes?|identical files|same files)\b"
+UNDO_WORDS = r"\b(undo|revert|roll ?back|put (?:the |my |all )?(?:files|them|everything) back)\b"
+# The agent only reports duplicates; requests to remove them need the model
+DESTRUCTIVE_WORDS = r"\b(delete|remove|erase|get rid of)\b"
+
+FOLDERS = {
+    "downloads": r"\bdownloads?\b",
+    "desktop": r"\bdesktop\b",
+    "documents": r"\b(documents|docs|my documents)\b",
+}
+
+# Spoken names for file types, mapped to the extension the executor matches on
+TYPE_SYNONYMS = {
+    "pdf": "pdf", "pdfs": "pdf",
+    "word document": "docx", "word documents": "docx", "word files": "docx",
+    "excel": "xlsx", "spreadsheet": "xlsx", "spreadsheets": "xlsx",
+    "text file": "txt", "text files": "txt",
+    "powerpoint": "pptx", "presentations": "pptx",
+    "jpeg": "jpg", "jpegs": "jpg", "jpgs": "jpg",
+    "pngs": "png", "gifs": "gif", "csvs": "csv", "zips": "zip",
+    "mp3s": "mp3", "mp4s": "mp4",
+}
+
+KNOWN_EXTENSIONS = {
+    "pdf", "doc", "docx", "txt", "rtf", "md", "odt", "xls", "xlsx", "csv", "ppt", "pptx",
+    "jpg", "jpeg", "png", "gif", "bmp", "svg", "webp", "heic", "tiff",
+    "mp3", "wav", "flac", "aac", "mp4", "mov", "avi", "mkv",
+    "zip", "rar", "7z", "tar", "gz", "exe", "dmg", "msi", "iso",
+    "py", "js", "html", "css", "json", "xml", "java", "cpp",
+}
+
+# Quotes must sit at word boundaries so apostrophes in "don't" or "John's" are ignored
+QUOTED = r"(?:^|(?<=\s))[\"'‘“]([^\"'‘’“”]+)[\"'’”](?=$|[\s.,;:!?])"
+PATH = r"(?:^|(?<=\s))(~[/\\][^\s\"']*|/[^\s\"']+|[a-zA-Z]:\\[^\s\"']*|\.{1,2}[/\\][^\s\"']*)"
+# Words that may follow a path in a command; anything else may be the rest of a
+# path that was cut at a space, e.g. "/home/me/My Docs"
+AFTER_PATH = r"^(?:by|and|then|for|with|that|which|into|to|from|in|on|named|called|larger|bigger|smaller|over|under|modified|created|older|newer|please|only|not)\b"
+NAMED = r"\b(?:named|called|name|titled|containing)\s+([^\s\"']+)"
+SIMILAR = r"\b(?:similar to|something like|names like|close to|like)\s+[\"'‘“]?([^\s\"'’”]+)"
+
+# Filters that turn a find into a find_files query
+SIZE_NUMBER = r"(\d+(?:\.\d+)?\s*(?:kb|mb|gb|tb|k|m|g|bytes?)?)\b"
+MIN_SIZE = rf"\b(?:larger|bigger|greater|more) than {SIZE_NUMBER}|\b(?:over|above|at least) {SIZE_NUMBER}"
+MAX_SIZE = rf"\b(?:smaller|less) than {SIZE_NUMBER}|\b(?:under|below|at most) {SIZE_NUMBER}"
+NEWER = r"\b(?:in|from|within|during) the (?:last|past) (?:(\d+) )?(day|week|month|year)s?\b"
+OLDER = r"\bolder than (?:(\d+) )?(day|week|month|year)s?\b"
+RECENT = {"today": 1, "this week": 7, "this month": 30, "this year": 365}
+LIMIT = r"\b(?:top|first|only|up to|at most|limit(?: to)?) (\d+)\b(?! ?(?:kb|mb|gb|tb|k|m|g|bytes?|days?|weeks?|months?|years?)\b)"
+NO_SUBFOLDERS = r"\b(?:not in subfolders|without subfolders|no subfolders|top level only|only in (?:this|the) folder)\b"
+DEPTH = r"\b(\d+) (?:levels?|folders?) deep\b"
+DAYS = {"day": 1, "week": 7, "month": 30, "year": 365}
+
+# Phrasing that usually needs the model: negations and chained requests
+AMBIGUOUS = r"\b(don't|do not|except|unless|and then|then|but not|instead)\b"
+# "then" chaining organize keys ("by type then date") is grammar, not a second request
+KEY_NAMES = "|".join(pattern.replace("\\bby ", "", 1) for pattern in (BY_TYPE, BY_DATE, BY_SIZE))
+KEY_THEN = rf"\b(?:and )?then (?:by )?(?:{KEY_NAMES})"
+
+class LocalParser:
+    """Deterministic grammar for the common commands.
+
+    parse() returns the same {"intent", "parameters"} structure as the LLM,
+    together with a confidence between 0 and 1.
+    """
+
+    def parse(self, user_input):
+        """Parse user input into (parsed request, confidence)"""
+        text = user_input.strip()
+        lowered = text.lower()
+
+        directory = self._extract_directory(text, lowered)
+        organize = re.search(ORGANIZE_WORDS, lowered) is not None
+        find = re.search(FIND_WORDS, lowered) is not None
+        duplicates = re.search(DUPLICATE_WORDS, lowered) is not None
+
+        if re.search(UNDO_WORDS, lowered):
+            return self._parse_undo(text, lowered, directory)
+
+        if duplicates and not organize:
+            parsed, confidence = self._parse_duplicates(lowered)
+        elif organize and not find:
+            parsed, confidence = self._parse_organize(lowered)
+        elif find and not organize:
+            parsed, confidence = self._parse_find(text, lowered, directory)
+        else:
+            return {"intent": "unknown", "parameters": {}}, 0.0
+
+        if parsed["intent"] == "unknown":
+            return parsed, confidence
+
+        if directory:
+            parsed["parameters"]["directory"] = directory
+        else:
+            # The model can use recent context to work out which folder is meant
+            confidence -= 0.25
+
+        if re.search(AMBIGUOUS, re.sub(KEY_THEN, " ", lowered)):
+            confidence -= 0.3
+
+        if self._path_may_continue(text):
+            confidence -= 0.3
+
+        return parsed, max(0.0, min(1.0, confidence))
+
+    def _parse_organize(self, lowered):
+        """Organize requests: by type, date or size, or by several of them nested"""
+        keys = self._extract_organize_keys(lowered)
+        use_modified = re.search(CREATED, lowered) is None
+
+        if keys == ["type"]:
+            return {"intent": "organize_by_type", "parameters": {}}, 0.95
+
+        if keys == ["date"]:
+            return {"intent": "organize_by_date", "parameters": {"use_modified": use_modified}}, 0.95
+
+        if keys == ["size"]:
+            return {"intent": "organize_by_size", "parameters": {}}, 0.95
+
+        if len(keys) > 1:
+            parameters = {"keys": keys}
+            if "date" in keys:
+                parameters["use_modified"] = use_modified
+            return {"intent": "organize_by_keys", "parameters": parameters}, 0.9
+
+        return {"intent": "unknown", "parameters": {}}, 0.2
+
+    def _extract_organize_keys(self, lowered):
+        """Organize keys in the order they are mentioned, e.g. "by type and then by year".
+
+        The first key needs a "by"; later ones may follow a connector instead
+        ("by type, date and size").
+        """
+        first = [match.start() for match in (
+            re.search(BY_TYPE, lowered), re.search(BY_DATE, lowered), re.search(BY_SIZE, lowered)
+        ) if match]
+        if not first:
+            return []
+
+        clause = lowered[min(first):]
+        found = []
+        for key, pattern in (("type", BY_TYPE), ("date", BY_DATE), ("size", BY_SIZE)):
+            # Later keys follow "by" or a connector such as "and", "then" or a comma
+            match = re.search(pattern.replace("\\bby ", KEY_LEAD), clause)
+            if match:
+                found.append((match.start(), key))
+        return [key for _, key in sorted(found)]
+
+    def _parse_undo(self, text, lowered, directory):
+        """Undoing the last organize run; without a folder it means the last run anywhere"""
+        parameters = {"directory": directory} if directory else {}
+        confidence = 0.9
+        if re.search(AMBIGUOUS, lowered):
+            confidence -= 0.3
+        if self._path_may_continue(text):
+            confidence -= 0.3
+        return {"intent": "undo_organize", "parameters": parameters}, confidence
+
+    def _parse_duplicates(self, lowered):
+        """Requests to find files with identical content"""
+        if re.search(DESTRUCTIVE_WORDS, lowered):
+            return {"intent": "find_duplicates", "parameters": {}}, 0.4
+        return {"intent": "find_duplicates", "parameters": {}}, 0.95
+
+    def _parse_find(self, text, lowered, directory):
+        """Find requests: by type, by exact name, by approximate name or by filters"""
+        similar = re.search(SIMILAR, text, re.IGNORECASE)
+        if similar:
+            return {"intent": "find_file_fuzzy", "parameters": {"file_name": similar.group(1)}}, 0.9
+
+        file_name = self._extract_file_name(text, directory)
+        filters = self._extract_filters(lowered)
+        if filters:
+            file_types = self._extract_file_types(lowered)
+            if file_types:
+                filters["extensions"] = file_types
+            if file_name:
+                filters["name"] = file_name
+            return {"intent": "find_files", "parameters": {"filters": filters}}, 0.85
+
+        if file_name:
+            return {"intent": "find_file_by_name", "parameters": {"file_name": file_name}}, 0.9
+
+        file_types = self._extract_file_types(lowered)
+        if len(file_types) == 1:
+            return {"intent": "find_files_by_type", "parameters": {"file_type": file_types[0]}}, 0.95
+        if len(file_types) > 1:
+            # Several types in one request is beyond a single find_files_by_type
+            return {"intent": "find_files_by_type", "parameters": {"file_type": file_types[0]}}, 0.4
+
+        return {"intent": "unknown", "parameters": {}}, 0.2
+
+    def _extract_filters(self, lowered):
+        """Size, date, depth and count conditions, in FileQuery.from_filters form"""
+        filters = {}
+        for key, pattern in (("min_size", MIN_SIZE), ("max_size", MAX_SIZE)):
+            match = re.search(pattern, lowered)
+            if match:
+                filters[key] = next(group for group in match.groups() if group).replace(" ", "")
+
+        newer = re.search(NEWER, lowered)
+        if newer:
+            filters["newer_than_days"] = int(newer.group(1) or 1) * DAYS[newer.group(2)]
+        else:
+            for phrase, days in RECENT.items():
+                if re.search(rf"\b{phrase}\b", lowered):
+                    filters["newer_than_days"] = days
+                    break
+
+        older = re.search(OLDER, lowered)
+        if older:
+            filters["older_than_days"] = int(older.group(1) or 1) * DAYS[older.group(2)]
+
+        limit = re.search(LIMIT, lowered)
+        if limit:
+            filters["limit"] = int(limit.group(1))
+
+        if re.search(NO_SUBFOLDERS, lowered):
+            filters["max_depth"] = 0
+        else:
+            depth = re.search(DEPTH, lowered)
+            if depth:
+                filters["max_depth"] = int(depth.group(1))
+        return filters
+
+    def _path_may_continue(self, text):
+        """Whether an unquoted path is followed by words that could belong to it"""
+        if any(os.sep in quoted or "/" in quoted or "\\" in quoted for quoted in re.findall(QUOTED, text)):
+            return False
+        path = re.search(PATH, text)
+        if not path:
+            return False
+        rest = text[path.end():].strip().rstrip(".,;!?").lower()
+        return rest != "" and re.search(AFTER_PATH, rest) is None
+
+    def extract_directory(self, user_input):
+        """The directory named in the request itself, or None"""
+        text = user_input.strip()
+        return self._extract_directory(text, text.lower())
+
+    def _extract_directory(self, text, lowered):
+        """An explicit path, or one of the well-known folders"""
+        for quoted in re.findall(QUOTED, text):
+            if os.sep in quoted or "/" in quoted or "\\" in quoted:
+                return os.path.expanduser(quoted)
+
+        path = re.search(PATH, text)
+        if path:
+            return os.path.expanduser(path.group(1).rstrip(".,;!?"))
+
+        for folder, pattern in FOLDERS.items():
+            if re.search(pattern, lowered):
+                return folder
+        return None
+
+    def _extract_file_name(self, text, directory):
+        """A quoted name, a 'named X' phrase, or a word that looks like a file name"""
+        for quoted in re.findall(QUOTED, text):
+            if os.path.expanduser(quoted) != directory:
+                return quoted
+
+        named = re.search(NAMED, text, re.IGNORECASE)
+        if named:
+            return named.group(1).rstrip(".,;!?")
+
+        for word in text.split():
+            word = word.strip(".,;!?")
+            stem, extension = os.path.splitext(word)
+            if stem and extension and extension.lower().lstrip(".") in KNOWN_EXTENSIONS:
+                if directory is None or word != directory:
+                    return word
+        return None
+
+    def _extract_file_types(self, lowered):
+        """File types mentioned in the request, spoken names first"""
+        found = []
+        for phrase, extension in sorted(TYPE_SYNONYMS.items(), key=lambda item: -len(item[0])):
+            if re.search(rf"\b{re.escape(phrase)}\b", lowered) and extension not in found:
+                found.append(extension)
+
+        for word in re.findall(r"\.?\b([a-z0-9]{1,5})\b", lowered):
+            if word in KNOWN_EXTENSIONS and word not in found:
+                found.append(word)
+        return found
\ No newline at end of file
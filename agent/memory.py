@@ -1,16 +1,24 @@
 import json
 import os
+import threading
 from datetime import datetime
-from config import MEMORY_FILE
+from agent.instrumentation import current_trace
+from config import MEMORY_FILE, MEMORY_JOURNAL_FILE, MEMORY_COMPACT_EVERY, MEMORY_MAX_ACTIONS
 
 class Memory:
-    def __init__(self):
-        self.memory_file = MEMORY_FILE
+    def __init__(self, memory_file=MEMORY_FILE, journal_file=MEMORY_JOURNAL_FILE,
+                 compact_every=MEMORY_COMPACT_EVERY, max_actions=MEMORY_MAX_ACTIONS):
+        self.memory_file = memory_file
+        self.journal_file = journal_file
+        self.compact_every = compact_every
+        self.max_actions = max_actions
         self.session_actions = []
+        # One Memory can be shared by several threads, e.g. Streamlit sessions
+        self.lock = threading.RLock()
         self.load_memory()
         
     def load_memory(self):
-        """Load existing memory if available"""
+        """Load the last snapshot and replay the journal written since"""
         if os.path.exists(self.memory_file):
             try:
                 with open(self.memory_file, 'r') as f:
@@ -19,12 +27,80 @@ class Memory:
                 self.long_term_memory = {"actions": [], "preferences": {}}
         else:
             self.long_term_memory = {"actions": [], "preferences": {}}
+        # Added after the first snapshots were written
+        self.long_term_memory.setdefault("watermarks", {})
+            
+        # Sequence number of the last journal entry folded into the snapshot
+        self.journal_seq = self.long_term_memory.pop("journal_seq", 0)
+        self.journal_entries = 0
+        
+        if os.path.exists(self.journal_file):
+            # Offset of the end of the last complete line, and of a torn line after it
+            good = 0
+            torn = None
+            with open(self.journal_file, 'rb') as f:
+                for line in f:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("torn line")
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A torn final line from an interrupted write
+                        torn = good
+                        good += len(line)
+                        continue
+                    good += len(line)
+                    torn = None
+                    # Entries already in the snapshot if compaction was interrupted
+                    if entry["seq"] <= self.journal_seq:
+                        continue
+                    self._apply_entry(entry)
+                    self.journal_seq = entry["seq"]
+                    self.journal_entries += 1
+            if torn is not None:
+                # The next entry would be glued onto it and lost as well
+                os.truncate(self.journal_file, torn)
+                    
+        if self.journal_entries >= self.compact_every:
+            self.save_memory()
+            
+    def _apply_entry(self, entry):
+        """Apply one journal entry to the in-memory state"""
+        if entry["op"] == "action":
+            self.long_term_memory["actions"].append(entry["action"])
+        elif entry["op"] == "preference":
+            self.long_term_memory["preferences"][entry["key"]] = entry["value"]
+        elif entry["op"] == "watermark":
+            self.long_term_memory["watermarks"].setdefault(entry["directory"], {})[entry["key"]] = entry["watermark"]
+            
+    def _append_journal(self, entry):
+        """Append an entry to the journal, compacting once it grows too long"""
+        with self.lock:
+            self.journal_seq += 1
+            entry["seq"] = self.journal_seq
+            with open(self.journal_file, 'a') as f:
+                f.write(json.dumps(entry) + "\n")
+                
+            self.journal_entries += 1
+            if self.journal_entries >= self.compact_every:
+                self.save_memory()
             
     def save_memory(self):
-        """Save memory to file"""
-        with open(self.memory_file, 'w') as f:
-            json.dump(self.long_term_memory, f, indent=2)
+        """Write a full snapshot and start a fresh journal"""
+        with self.lock:
+            if self.max_actions is not None:
+                del self.long_term_memory["actions"][:-self.max_actions or None]
+                
+            snapshot = dict(self.long_term_memory, journal_seq=self.journal_seq)
+            temp_file = self.memory_file + ".tmp"
+            with open(temp_file, 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(temp_file, self.memory_file)
             
+            # Safe to truncate: replay skips anything the snapshot already holds
+            open(self.journal_file, 'w').close()
+            self.journal_entries = 0
+        
     def add_action(self, action_type, details, success=True):
         """Record an action taken by the agent"""
         action = {
@@ -33,9 +109,15 @@ class Memory:
             "timestamp": datetime.now().isoformat(),
             "success": success
         }
-        self.session_actions.append(action)
-        self.long_term_memory["actions"].append(action)
-        self.save_memory()
+        # Timings and counters of the command so far, when it is being traced
+        trace = current_trace()
+        if trace is not None:
+            metrics = trace.to_dict()
+            action["metrics"] = {"spans": metrics["spans"], "counters": metrics["counters"]}
+        with self.lock:
+            self.session_actions.append(action)
+            self.long_term_memory["actions"].append(action)
+            self._append_journal({"op": "action", "action": action})
         
     def get_recent_actions(self, limit=5):
         """Get most recent actions from memory"""
@@ -43,9 +125,25 @@ class Memory:
         
     def update_preference(self, key, value):
         """Save user preferences"""
-        self.long_term_memory["preferences"][key] = value
-        self.save_memory()
+        # Unchanged values, such as re-running in the same directory, cost nothing
+        with self.lock:
+            preferences = self.long_term_memory["preferences"]
+            if key in preferences and preferences[key] == value:
+                return
+            preferences[key] = value
+            self._append_journal({"op": "preference", "key": key, "value": value})
         
     def get_preference(self, key, default=None):
         """Retrieve user preferences"""
-        return self.long_term_memory["preferences"].get(key, default)
\ No newline at end of file
+        return self.long_term_memory["preferences"].get(key, default)
+        
+    def get_watermark(self, directory, key):
+        """What the last organize run of directory by key left behind, or None"""
+        return self.long_term_memory["watermarks"].get(os.path.abspath(directory), {}).get(key)
+        
+    def update_watermark(self, directory, key, watermark):
+        """Save {"last_run", "mtime_ns", "inodes"} after an organize run of directory by key"""
+        directory = os.path.abspath(directory)
+        with self.lock:
+            self.long_term_memory["watermarks"].setdefault(directory, {})[key] = watermark
+            self._append_journal({"op": "watermark", "directory": directory, "key": key, "watermark": watermark})
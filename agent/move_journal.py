@@ -0,0 +1,229 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from itertools import repeat
+from config import MOVE_JOURNAL_DIR, MOVE_JOURNAL_CHECKPOINT, MOVE_JOURNAL_KEEP
+
+# Moves per line when the plan is written out
+CHUNK = 1000
+
+def _sync_directory(directory):
+    """Make a new or renamed file's directory entry durable (POSIX only)"""
+    if os.name != "posix":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+class MoveJournal:
+    """Durable record of one organize run, written before any file moves.
+
+    A JSON lines file: the plan, the target directories the run created,
+    redirects for names taken after planning, batches of finished move
+    numbers, then "complete" or "undone". Every line is fsynced.
+    """
+
+    def __init__(self, path, header, moves, done=None, created_dirs=None, status="running"):
+        self.path = path
+        self.header = header
+        # [source, destination, info, size] lists, numbered by position
+        self.moves = moves
+        self.done = done if done is not None else set()
+        self.created_dirs = created_dirs or []
+        self.status = status
+        # Move numbers finished but not yet checkpointed
+        self.pending = []
+        # Plan position -> journal move number, when applying only some moves
+        self.rows = None
+        # Moves are redirected from worker threads
+        self.lock = threading.Lock()
+
+    @property
+    def directory(self):
+        return self.header["directory"]
+
+    @property
+    def key(self):
+        return self.header["key"]
+
+    @classmethod
+    def create(cls, move_plan, key, journal_dir=MOVE_JOURNAL_DIR):
+        """Write a MovePlan out durably and return its journal"""
+        os.makedirs(journal_dir, exist_ok=True)
+        directory = os.path.abspath(move_plan.directory)
+        header = {
+            "op": "plan",
+            "action": move_plan.action,
+            "key": key,
+            "directory": directory,
+            "started": time.time(),
+            "inodes": sorted(move_plan.inodes)
+        }
+        sizes = move_plan.sizes or repeat(0)
+        moves = [
+            [source, destination, info, size]
+            for (source, destination, info), size in zip(move_plan.moves, sizes)
+        ]
+
+        # Time first, so a directory listing sorts journals oldest to newest
+        name = f"{time.time_ns()}_{_directory_id(directory)}.jsonl"
+        path = os.path.join(journal_dir, name)
+        # Renamed into place, so a journal never holds part of a plan
+        temp_file = path + ".tmp"
+        with open(temp_file, "w") as f:
+            f.write(json.dumps(header) + "\n")
+            for start in range(0, len(moves), CHUNK):
+                f.write(json.dumps({"op": "moves", "moves": moves[start:start + CHUNK]}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, path)
+        _sync_directory(journal_dir)
+        return cls(path, header, moves)
+
+    @classmethod
+    def load(cls, path):
+        """Read a journal back; a torn last line from a crash is cut off"""
+        header = None
+        moves = []
+        done = set()
+        created_dirs = []
+        status = "running"
+        # Bytes up to the end of the last complete line
+        good = 0
+        torn = False
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("torn line")
+                    entry = json.loads(line)
+                except ValueError:
+                    torn = True
+                    break
+                good += len(line)
+                if entry["op"] == "plan":
+                    header = entry
+                elif entry["op"] == "moves":
+                    moves.extend(entry["moves"])
+                elif entry["op"] == "dirs":
+                    created_dirs.extend(entry["created"])
+                elif entry["op"] == "done":
+                    done.update(entry["rows"])
+                elif entry["op"] == "redirect":
+                    moves[entry["row"]][1] = entry["to"]
+                elif entry["op"] in ("complete", "undone"):
+                    status = entry["op"]
+        if header is None:
+            raise ValueError(f"Not a move journal: {path}")
+        if torn:
+            # Later entries are appended after it, so it must go
+            os.truncate(path, good)
+        return cls(path, header, moves, done, created_dirs, status)
+
+    def _append(self, entry):
+        with self.lock:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def record_created_dirs(self, directories):
+        """Target directories the run made, for undo to remove again"""
+        if directories:
+            self.created_dirs.extend(directories)
+            self._append({"op": "dirs", "created": list(directories)})
+
+    def _row(self, position):
+        return self.rows[position] if self.rows is not None else position
+
+    def redirect(self, position, destination):
+        """Note a new destination for a move before the file goes there"""
+        row = self._row(position)
+        self.moves[row][1] = destination
+        self._append({"op": "redirect", "row": row, "to": destination})
+
+    def mark_done(self, position):
+        """Note a finished move by its position in the plan being applied"""
+        self.mark_row_done(self._row(position))
+
+    def mark_row_done(self, row):
+        """Note a finished move; written out every MOVE_JOURNAL_CHECKPOINT moves"""
+        self.done.add(row)
+        self.pending.append(row)
+        if len(self.pending) >= MOVE_JOURNAL_CHECKPOINT:
+            self.checkpoint()
+
+    def checkpoint(self):
+        if self.pending:
+            self._append({"op": "done", "rows": self.pending})
+            self.pending = []
+
+    def complete(self):
+        self.checkpoint()
+        self.status = "complete"
+        self._append({"op": "complete"})
+
+    def mark_undone(self):
+        self.checkpoint()
+        self.status = "undone"
+        self._append({"op": "undone"})
+
+def _directory_id(directory):
+    return hashlib.sha1(directory.encode("utf-8", "surrogateescape")).hexdigest()[:12]
+
+def journals(directory=None, journal_dir=MOVE_JOURNAL_DIR):
+    """Journal paths, newest first, for one directory or for all"""
+    try:
+        names = os.listdir(journal_dir)
+    except FileNotFoundError:
+        return []
+    suffix = f"_{_directory_id(os.path.abspath(directory))}.jsonl" if directory else ".jsonl"
+    return [
+        os.path.join(journal_dir, name)
+        for name in sorted(names, reverse=True)
+        if name.endswith(suffix)
+    ]
+
+def _final_status(path):
+    """"running", "complete" or "undone", from the last line alone"""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - 64))
+        tail = f.read()
+    for final in ("complete", "undone"):
+        if tail.endswith(json.dumps({"op": final}).encode() + b"\n"):
+            return final
+    return "running"
+
+def _load_all(directory, journal_dir, statuses):
+    """MoveJournals with one of statuses, newest first, skipping any that cannot be read"""
+    for path in journals(directory, journal_dir):
+        try:
+            if _final_status(path) in statuses:
+                yield MoveJournal.load(path)
+        except (OSError, ValueError):
+            continue
+
+def find_unfinished(directory, key, journal_dir=MOVE_JOURNAL_DIR):
+    """The newest interrupted run of directory organized by key, or None"""
+    for journal in _load_all(directory, journal_dir, ("running",)):
+        if journal.key == key:
+            return journal
+    return None
+
+def find_last(directory=None, journal_dir=MOVE_JOURNAL_DIR):
+    """The newest run that has not been undone, of directory or of any directory"""
+    return next(_load_all(directory, journal_dir, ("running", "complete")), None)
+
+def prune(journal_dir=MOVE_JOURNAL_DIR, keep=MOVE_JOURNAL_KEEP):
+    """Delete all but the newest keep journals; interrupted runs are kept"""
+    for path in journals(journal_dir=journal_dir)[keep:]:
+        try:
+            if _final_status(path) != "running":
+                os.remove(path)
+        except OSError:
+            continue
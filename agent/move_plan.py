@@ -0,0 +1,92 @@
+import os
+from agent.instrumentation import count
+
+class MovePlan:
+    def __init__(self, action, directory):
+        self.action = action
+        self.directory = directory
+        # Every directory the plan moves files into, listed once
+        self.target_dirs = []
+        # The target directories that did not exist yet when planning
+        self.new_dirs = set()
+        # (source, destination, info) with collisions already resolved
+        self.moves = []
+        # Size in bytes of each move's file, when the planner knew it
+        self.sizes = []
+        # Files that could not be planned, in the executor's error format
+        self.errors = []
+        # Inodes of every file the planner looked at, moved or not
+        self.inodes = set()
+
+    def __len__(self):
+        return len(self.moves)
+
+    def total_bytes(self):
+        """Bytes the plan moves, or None if its sizes are unknown"""
+        return sum(self.sizes) if self.sizes else None
+
+    def to_dict(self):
+        """Plain representation for debug output and previews"""
+        return {
+            "action": self.action,
+            "directory": self.directory,
+            "target_dirs": list(self.target_dirs),
+            "moves": [
+                {"from": source, "to": destination, **info}
+                for source, destination, info in self.moves
+            ],
+            "errors": list(self.errors)
+        }
+
+def _existing_names(directory):
+    """Names already present in a destination, from a single listing; None if it is missing"""
+    count("listdir")
+    try:
+        return {os.path.normcase(name) for name in os.listdir(directory)}
+    except FileNotFoundError:
+        return None
+    except NotADirectoryError:
+        return set()
+
+def _free_name(name, taken):
+    """First of name, name_1, name_2, ... that is not taken"""
+    if os.path.normcase(name) not in taken:
+        return name
+
+    base, extension = os.path.splitext(name)
+    counter = 1
+    while os.path.normcase(f"{base}_{counter}{extension}") in taken:
+        counter += 1
+    return f"{base}_{counter}{extension}"
+
+def free_destination(destination):
+    """The next free name beside destination, for a file that took it after planning"""
+    directory, name = os.path.split(destination)
+    return os.path.join(directory, _free_name(name, _existing_names(directory) or set()))
+
+def build_move_plan(action, directory, entries, sizes=None):
+    """Build a MovePlan from (source, target_dir, info) entries.
+
+    Each target directory is listed once; name collisions, both with files
+    already there and between the planned moves, are resolved in memory.
+    sizes, if given, lists each entry's file size in the same order.
+    """
+    plan = MovePlan(action, directory)
+    plan.sizes = list(sizes) if sizes is not None else []
+    taken_by_dir = {}
+
+    for source, target_dir, info in entries:
+        taken = taken_by_dir.get(target_dir)
+        if taken is None:
+            taken = _existing_names(target_dir)
+            if taken is None:
+                plan.new_dirs.add(target_dir)
+                taken = set()
+            taken_by_dir[target_dir] = taken
+            plan.target_dirs.append(target_dir)
+
+        name = _free_name(os.path.basename(source), taken)
+        taken.add(os.path.normcase(name))
+        plan.moves.append((source, os.path.join(target_dir, name), info))
+
+    return plan
\ No newline at end of file
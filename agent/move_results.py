@@ -0,0 +1,125 @@
+import os
+from array import array
+
+class MoveResults:
+    """The files an organize run moved, stored by column.
+
+    Directories and category values (types, date categories, folders) are
+    interned once in small tables and every moved file refers to them by
+    number from typed arrays, so a file costs its name plus a few bytes per
+    column. Destination names are only stored for files renamed to avoid a
+    collision. Iterating still yields the {"from", "to", **info} dicts the
+    executor has always reported.
+    """
+
+    def __init__(self):
+        # Info keys, e.g. ["type"] or ["type", "date_category", "folder"]
+        self.fields = None
+        self.directories = []
+        self.categories = []
+        self._directory_codes = {}
+        self._category_codes = {}
+        self.names = []
+        self.source_dirs = array("I")
+        self.target_dirs = array("I")
+        self.columns = {}
+        # row -> destination name, for the few files renamed on the way
+        self.renamed = {}
+
+    def _directory_code(self, directory):
+        code = self._directory_codes.get(directory)
+        if code is None:
+            code = self._directory_codes[directory] = len(self.directories)
+            self.directories.append(directory)
+        return code
+
+    def _category_code(self, value):
+        code = self._category_codes.get(value)
+        if code is None:
+            code = self._category_codes[value] = len(self.categories)
+            self.categories.append(value)
+        return code
+
+    def append(self, item):
+        """Add one {"from", "to", **info} item as yielded by Executor.iter_move_plan"""
+        if self.fields is None:
+            self.fields = [key for key in item if key not in ("from", "to")]
+            self.columns = {field: array("I") for field in self.fields}
+
+        source_dir, name = os.path.split(item["from"])
+        target_dir, target_name = os.path.split(item["to"])
+        if target_name != name:
+            self.renamed[len(self.names)] = target_name
+        self.names.append(name)
+        self.source_dirs.append(self._directory_code(source_dir))
+        self.target_dirs.append(self._directory_code(target_dir))
+        for field in self.fields:
+            self.columns[field].append(self._category_code(item.get(field)))
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, row):
+        name = self.names[row]
+        item = {
+            "from": os.path.join(self.directories[self.source_dirs[row]], name),
+            "to": os.path.join(self.directories[self.target_dirs[row]], self.renamed.get(row, name))
+        }
+        for field in self.fields or ():
+            item[field] = self.categories[self.columns[field][row]]
+        return item
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+    def values(self, field):
+        """One info field for every file, e.g. values("type")"""
+        categories = self.categories
+        return [categories[code] for code in self.columns[field]]
+
+    def target_directories(self):
+        """The directory every file was moved into"""
+        directories = self.directories
+        return [directories[code] for code in self.target_dirs]
+
+    def source_directories(self):
+        """The directory every file was moved out of"""
+        directories = self.directories
+        return [directories[code] for code in self.source_dirs]
+
+    def counts(self, field):
+        """Files per value of an info field, without building the column"""
+        counts = {}
+        for code in self.columns[field]:
+            counts[code] = counts.get(code, 0) + 1
+        return {self.categories[code]: number for code, number in counts.items()}
+
+    def to_dict(self):
+        """Compact JSON-ready form; from_dict() restores it"""
+        return {
+            "fields": self.fields or [],
+            "directories": self.directories,
+            "categories": self.categories,
+            "names": self.names,
+            "source_dirs": self.source_dirs.tolist(),
+            "target_dirs": self.target_dirs.tolist(),
+            "columns": {field: column.tolist() for field, column in self.columns.items()},
+            # JSON object keys are strings, so rows are kept as pairs
+            "renamed": sorted(self.renamed.items())
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        results = cls()
+        results.fields = list(data["fields"]) or None
+        results.directories = list(data["directories"])
+        results.categories = list(data["categories"])
+        results._directory_codes = {directory: code for code, directory in enumerate(results.directories)}
+        results._category_codes = {value: code for code, value in enumerate(results.categories)}
+        results.names = list(data["names"])
+        results.source_dirs = array("I", data["source_dirs"])
+        results.target_dirs = array("I", data["target_dirs"])
+        results.columns = {field: array("I", column) for field, column in data["columns"].items()}
+        results.renamed = {row: name for row, name in data["renamed"]}
+        return results
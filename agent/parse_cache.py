@@ -0,0 +1,142 @@
+import copy
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from config import PARSE_CACHE_FILE, PARSE_CACHE_SIZE, PARSE_CACHE_MEMORY_SIZE, PARSE_CACHE_TTL
+
+def cache_fingerprint(*parts):
+    """Hash of everything that shapes a parse, such as the prompt and model name"""
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+def normalize_request(user_input):
+    """Cache key for a request: case, spacing, quotes and trailing punctuation ignored.
+
+    Words that look like paths keep their case, since paths can be case sensitive.
+    """
+    text = re.sub(r"[‘’]", "'", re.sub(r"[“”]", '"', user_input))
+    words = [
+        word if ("/" in word or "\\" in word) else word.lower()
+        for word in text.split()
+    ]
+    return " ".join(words).rstrip(".!?")
+
+class ParseCache:
+    def __init__(self, fingerprint, cache_file=PARSE_CACHE_FILE, max_entries=PARSE_CACHE_SIZE,
+                 memory_entries=PARSE_CACHE_MEMORY_SIZE, ttl=PARSE_CACHE_TTL):
+        self.fingerprint = fingerprint
+        self.cache_file = cache_file
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        # key -> (stored_at, parsed), most recently used last
+        self.memory = OrderedDict()
+        self.disk = self._load()
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+
+    def _load(self):
+        """Read the persistent tier, discarding it if the prompt or model changed"""
+        if not os.path.exists(self.cache_file):
+            return {}
+        try:
+            with open(self.cache_file, 'r') as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        if stored.get("fingerprint") != self.fingerprint:
+            return {}
+
+        now = time.time()
+        return {
+            key: (entry["stored_at"], entry["parsed"])
+            for key, entry in stored.get("entries", {}).items()
+            if now - entry["stored_at"] < self.ttl
+        }
+
+    def _save(self):
+        """Write the persistent tier atomically"""
+        stored = {
+            "fingerprint": self.fingerprint,
+            "entries": {
+                key: {"stored_at": stored_at, "parsed": parsed}
+                for key, (stored_at, parsed) in self.disk.items()
+            }
+        }
+        temp_file = self.cache_file + ".tmp"
+        with open(temp_file, 'w') as f:
+            json.dump(stored, f)
+        os.replace(temp_file, self.cache_file)
+
+    def get(self, user_input):
+        """Return a cached parse for user_input, or None"""
+        key = normalize_request(user_input)
+        now = time.time()
+
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None and now - entry[0] < self.ttl:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                return copy.deepcopy(entry[1])
+
+            entry = self.disk.get(key)
+            if entry is not None and now - entry[0] < self.ttl:
+                self._remember(key, entry)
+                self.hits += 1
+                return copy.deepcopy(entry[1])
+
+            self.memory.pop(key, None)
+            self.misses += 1
+            return None
+
+    def put(self, user_input, parsed):
+        """Store a parse in both tiers"""
+        key = normalize_request(user_input)
+        entry = (time.time(), copy.deepcopy(parsed))
+
+        with self.lock:
+            self._remember(key, entry)
+            self.disk[key] = entry
+            if len(self.disk) > self.max_entries:
+                # Drop the oldest entries first
+                for old_key in sorted(self.disk, key=lambda k: self.disk[k][0])[:len(self.disk) - self.max_entries]:
+                    del self.disk[old_key]
+            try:
+                self._save()
+            except OSError as e:
+                print(f"Error saving parse cache: {str(e)}")
+
+    def _remember(self, key, entry):
+        """Put an entry in the in-memory LRU tier"""
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def clear(self):
+        """Forget every cached parse"""
+        with self.lock:
+            self.memory.clear()
+            self.disk = {}
+            self._save()
+
+    def stats(self):
+        """Hit and miss counters; every hit is an LLM round trip avoided"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.hits - self.memory_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self.disk)
+            }
\ No newline at end of file
@@ -0,0 +1,80 @@
+import threading
+from collections import deque
+from agent.instrumentation import percentile
+
+# Latency samples kept per path
+LATENCY_WINDOW = 500
+
+# Parameters compared when deciding whether the two parsers agree
+COMPARED_PARAMETERS = ("directory", "file_type", "file_name", "use_modified")
+
+def parses_agree(first, second):
+    """Same intent, and no conflicting value for any parameter both of them set"""
+    if first["intent"] != second["intent"]:
+        return False
+    for key in COMPARED_PARAMETERS:
+        if key in first["parameters"] and key in second["parameters"]:
+            if first["parameters"][key] != second["parameters"][key]:
+                return False
+    return True
+
+class ParseStats:
+    """Latency per parse path and local/LLM agreement, for tuning confidence thresholds"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.answered_by = {}
+        self.llm_failures = 0
+        # Confidence bucket (0.0, 0.1, ...) -> [comparisons, agreements]
+        self.agreement = {}
+
+    def record_latency(self, path, seconds):
+        """Time taken by one parse path: cache, local or llm"""
+        with self.lock:
+            self.latencies.setdefault(path, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+    def record_answer(self, path):
+        """Which path's result was returned to the caller"""
+        with self.lock:
+            self.answered_by[path] = self.answered_by.get(path, 0) + 1
+
+    def record_failure(self):
+        """An LLM request that errored or timed out"""
+        with self.lock:
+            self.llm_failures += 1
+
+    def record_comparison(self, confidence, local_parse, llm_parse):
+        """Compare both parses of the same request, bucketed by local confidence"""
+        bucket = round(int(confidence * 10) / 10, 1)
+        agreed = parses_agree(local_parse, llm_parse)
+        with self.lock:
+            counts = self.agreement.setdefault(bucket, [0, 0])
+            counts[0] += 1
+            counts[1] += int(agreed)
+        return agreed
+
+    def summary(self):
+        """Plain dict of latency percentiles, winners and agreement rates"""
+        with self.lock:
+            latency = {
+                path: {
+                    "count": len(samples),
+                    "mean_ms": 1000 * sum(samples) / len(samples),
+                    "p50_ms": 1000 * percentile(samples, 0.5),
+                    "p95_ms": 1000 * percentile(samples, 0.95),
+                }
+                for path, samples in self.latencies.items() if samples
+            }
+            compared = sum(counts[0] for counts in self.agreement.values())
+            agreed = sum(counts[1] for counts in self.agreement.values())
+            return {
+                "latency": latency,
+                "answered_by": dict(self.answered_by),
+                "llm_failures": self.llm_failures,
+                "agreement_rate": agreed / compared if compared else None,
+                "agreement_by_confidence": {
+                    f"{bucket:.1f}": {"compared": counts[0], "agreed": counts[1]}
+                    for bucket, counts in sorted(self.agreement.items())
+                }
+            }
\ No newline at end of file
@@ -1,22 +1,26 @@
-from config import DEFAULT_WORKSPACE
+from config import DEFAULT_WORKSPACE, PARALLEL_MOVES, MOVE_WORKERS, ORGANIZE_KEYS
+from agent.instrumentation import span
+from agent.query import FileQuery
 import os
 
 class Planner:
     def __init__(self, memory):
         self.memory = memory
         
+    @span("plan")
     def create_plan(self, parsed_request):
         """Create execution plan from parsed request"""
         intent = parsed_request["intent"]
         parameters = parsed_request["parameters"]
         
         # Resolve directory path
-        directory = self._resolve_directory(parameters.get("directory", DEFAULT_WORKSPACE))
+        directory = self.resolve_directory(parameters.get("directory", DEFAULT_WORKSPACE))
         
         if intent == "organize_by_type":
             return {
                 "action": "organize_by_type",
                 "directory": directory,
+                **self._execution_mode(parameters),
                 "description": f"Organizing files in {directory} by file type"
             }
             
@@ -27,9 +31,46 @@ class Planner:
                 "action": "organize_by_date",
                 "directory": directory,
                 "use_modified": use_modified,
+                **self._execution_mode(parameters),
                 "description": f"Organizing files in {directory} by {date_type} date"
             }
             
+        elif intent == "organize_by_size":
+            return {
+                "action": "organize_by_size",
+                "directory": directory,
+                **self._execution_mode(parameters),
+                "description": f"Organizing files in {directory} by size"
+            }
+            
+        elif intent == "organize_by_keys":
+            # Keep the requested nesting order, dropping repeats and unknown keys
+            keys = []
+            for key in parameters.get("keys", []):
+                key = str(key).lower()
+                if key in ORGANIZE_KEYS and key not in keys:
+                    keys.append(key)
+            if not keys:
+                return {
+                    "action": "unknown",
+                    "description": "Sorry, I can only organize by type, date or size."
+                }
+            
+            # A single key is just the ordinary organize
+            if len(keys) == 1:
+                single = {"type": "organize_by_type", "date": "organize_by_date", "size": "organize_by_size"}[keys[0]]
+                return self.create_plan({"intent": single, "parameters": parameters})
+            
+            use_modified = parameters.get("use_modified", True)
+            return {
+                "action": "organize_by_keys",
+                "directory": directory,
+                "keys": keys,
+                "use_modified": use_modified,
+                **self._execution_mode(parameters),
+                "description": f"Organizing files in {directory} by {', then '.join(keys)}"
+            }
+            
         elif intent == "find_files_by_type":
             file_type = parameters.get("file_type", "")
             return {
@@ -47,6 +88,47 @@ class Planner:
                 "file_name": file_name,
                 "description": f"Finding files matching '{file_name}' in {directory}"
             }
+
+        elif intent == "find_file_fuzzy":
+            file_name = parameters.get("file_name", "")
+            return {
+                "action": "find_file_fuzzy",
+                "directory": directory,
+                "file_name": file_name,
+                "description": f"Finding files with names similar to '{file_name}' in {directory}"
+            }
+
+        elif intent == "find_files":
+            filters = parameters.get("filters") or {}
+            try:
+                query = FileQuery.from_filters(filters)
+            except (TypeError, ValueError) as e:
+                return {
+                    "action": "unknown",
+                    "description": f"Sorry, I couldn't use those filters: {str(e)}"
+                }
+            return {
+                "action": "find_files",
+                "directory": directory,
+                "filters": filters,
+                "description": f"Finding {query.describe()} in {directory}"
+            }
+
+        elif intent == "find_duplicates":
+            return {
+                "action": "find_duplicates",
+                "directory": directory,
+                "description": f"Finding duplicate files in {directory}"
+            }
+            
+        elif intent == "undo_organize":
+            # Without a folder, the last organize run anywhere is undone
+            target = self.resolve_directory(parameters["directory"]) if parameters.get("directory") else None
+            return {
+                "action": "undo_organize",
+                "directory": target,
+                "description": f"Undoing the last organize run in {target}" if target else "Undoing the last organize run"
+            }
             
         else:
             return {
@@ -57,7 +139,13 @@ class Planner:
 
 
             
-    def _resolve_directory(self, directory_name):
+    def _execution_mode(self, parameters):
+        """Choose between sequential and thread-pooled moves for organize plans"""
+        parallel = bool(parameters.get("parallel", PARALLEL_MOVES))
+        workers = int(parameters.get("workers", MOVE_WORKERS)) if parallel else 1
+        return {"parallel": parallel, "workers": max(1, workers)}
+            
+    def resolve_directory(self, directory_name):
         """Resolve directory name to absolute path"""
         # Handle special names
         if directory_name.lower() in ["downloads", "download"]:
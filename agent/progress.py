@@ -0,0 +1,110 @@
+import threading
+import time
+from agent.utils.file_helpers import format_size
+from config import PROGRESS_INTERVAL
+
+class Progress:
+    """Progress of one long operation, reported through a callback.
+
+    The executor calls advance() once per file on the thread consuming the
+    results; callback(progress) runs there too, at most once per interval
+    and once more at the end. cancel() may be called from any thread, or
+    from the callback itself, and stops the operation before its next file.
+    """
+
+    def __init__(self, callback=None, interval=PROGRESS_INTERVAL):
+        self.callback = callback
+        self.interval = interval
+        # Unknown until the operation has planned its work
+        self.total = None
+        self.total_bytes = None
+        self.processed = 0
+        self.bytes_done = 0
+        self.errors = 0
+        self.started = time.perf_counter()
+        self.running = False
+        self.last_report = None
+        self.finished = False
+        self._cancelled = threading.Event()
+
+    def start(self, total=None, total_bytes=None):
+        """Add work once it is known, e.g. per phase; the clock starts with the first"""
+        if total is not None:
+            self.total = (self.total or 0) + total
+        if total_bytes is not None:
+            self.total_bytes = (self.total_bytes or 0) + total_bytes
+        if not self.running:
+            self.started = time.perf_counter()
+            self.running = True
+        self.finished = False
+        self._report(force=True)
+
+    def advance(self, files=1, bytes_done=0, error=False):
+        self.processed += files
+        self.bytes_done += bytes_done
+        if error:
+            self.errors += files
+        self._report()
+
+    def finish(self):
+        self.finished = True
+        self._report(force=True)
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def fraction(self):
+        """Share of the work done, or None while the total is unknown"""
+        if not self.total:
+            return 1.0 if self.finished else None
+        return min(1.0, self.processed / self.total)
+
+    @property
+    def eta(self):
+        """Estimated seconds left, or None while it cannot be estimated"""
+        if not self.total or not self.processed or self.finished:
+            return None
+        return self.elapsed / self.processed * max(0, self.total - self.processed)
+
+    def _report(self, force=False):
+        if self.callback is None:
+            return
+        now = time.perf_counter()
+        if force or self.last_report is None or now - self.last_report >= self.interval:
+            self.last_report = now
+            self.callback(self)
+
+    def describe(self):
+        """One line such as "1200/5000 files (24%), 310.0 MB, about 12s left" """
+        if self.total is not None:
+            text = f"{self.processed}/{self.total} files ({self.fraction:.0%})"
+        else:
+            text = f"{self.processed} files"
+        if self.bytes_done:
+            text += f", {format_size(self.bytes_done)}"
+        if self.errors:
+            text += f", {self.errors} failed"
+        if self.eta is not None:
+            text += f", about {self.eta:.0f}s left"
+        return text
+
+    def to_dict(self):
+        return {
+            "processed": self.processed,
+            "total": self.total,
+            "bytes_done": self.bytes_done,
+            "total_bytes": self.total_bytes,
+            "errors": self.errors,
+            "elapsed": self.elapsed,
+            "eta": self.eta,
+            "cancelled": self.cancelled
+        }
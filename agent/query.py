@@ -0,0 +1,178 @@
+import os
+import re
+import time
+from datetime import datetime
+from agent.instrumentation import count
+from agent.utils.file_helpers import FileRecord, get_file_type, format_size
+from agent.utils.walker import walk_tree
+from config import WALK_WORKERS
+
+SIZE_UNITS = {"": 1, "b": 1, "kb": 1024, "k": 1024, "mb": 1024 ** 2, "m": 1024 ** 2,
+              "gb": 1024 ** 3, "g": 1024 ** 3, "tb": 1024 ** 4}
+
+DAY = 24 * 60 * 60
+
+def parse_size(value):
+    """Bytes from 1048576, "10MB", "1.5 gb" or "500k"; None stays None"""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    match = re.fullmatch(r"\s*([\d.]+)\s*([a-zA-Z]*)\s*", str(value))
+    if not match or match.group(2).lower() not in SIZE_UNITS:
+        raise ValueError(f"Not a file size: {value}")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).lower()])
+
+def parse_date(value):
+    """Timestamp from an ISO date such as "2024-01-31"; None stays None"""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    return datetime.fromisoformat(str(value)).timestamp()
+
+class FileQuery:
+    """Composable file filters, evaluated in one directory walk or pushed into the index.
+
+    Every set filter must match. Cheap name checks run before anything that
+    needs a stat, subtrees deeper than max_depth are never listed, and the
+    walk stops as soon as limit files have matched.
+    """
+
+    def __init__(self, name=None, extensions=None, min_size=None, max_size=None,
+                 modified_after=None, modified_before=None, max_depth=None, limit=None):
+        self.name = name.lower() if name else None
+        self.extensions = {extension.lower().lstrip(".") for extension in extensions} if extensions else None
+        self.min_size = parse_size(min_size)
+        self.max_size = parse_size(max_size)
+        self.modified_after = parse_date(modified_after)
+        self.modified_before = parse_date(modified_before)
+        self.max_depth = None if max_depth is None else int(max_depth)
+        self.limit = None if limit is None else int(limit)
+
+    @classmethod
+    def from_filters(cls, filters, now=None):
+        """Build a query from plan filters, as emitted by the LLM or local grammar.
+
+        Besides the constructor arguments, "extension" (a single one),
+        "newer_than_days" and "older_than_days" are accepted.
+        """
+        filters = dict(filters)
+        now = time.time() if now is None else now
+        extensions = filters.pop("extensions", None) or []
+        if isinstance(extensions, str):
+            extensions = [extensions]
+        if filters.get("extension"):
+            extensions = list(extensions) + [filters.pop("extension")]
+        filters.pop("extension", None)
+
+        newer_than_days = filters.pop("newer_than_days", None)
+        older_than_days = filters.pop("older_than_days", None)
+        if newer_than_days is not None:
+            filters["modified_after"] = now - float(newer_than_days) * DAY
+        if older_than_days is not None:
+            filters["modified_before"] = now - float(older_than_days) * DAY
+
+        known = {"name", "min_size", "max_size", "modified_after", "modified_before", "max_depth", "limit"}
+        return cls(extensions=extensions or None, **{key: value for key, value in filters.items()
+                                                     if key in known and value is not None})
+
+    def needs_stat(self):
+        """Whether any filter looks at more than the name"""
+        return any(value is not None for value in (
+            self.min_size, self.max_size, self.modified_after, self.modified_before
+        ))
+
+    def name_matches(self, name):
+        if self.extensions is not None and get_file_type(name) not in self.extensions:
+            return False
+        if self.name is not None and self.name not in name.lower():
+            return False
+        return True
+
+    def stat_matches(self, record):
+        if self.min_size is not None and record.size < self.min_size:
+            return False
+        if self.max_size is not None and record.size > self.max_size:
+            return False
+        if self.modified_after is not None and record.mtime < self.modified_after:
+            return False
+        if self.modified_before is not None and record.mtime > self.modified_before:
+            return False
+        return True
+
+    def walk(self, directory, workers=WALK_WORKERS):
+        """Yield the paths of matching files below directory from a single parallel walk.
+
+        With a limit, directories are read back in pre-order so every run
+        stops at the same files.
+        """
+        matched = 0
+        for paths in walk_tree(directory, self._matching_entries, workers,
+                               ordered=self.limit is not None, max_depth=self.max_depth):
+            for path in paths:
+                yield path
+                matched += 1
+                if self.limit is not None and matched >= self.limit:
+                    return
+
+    def _matching_entries(self, directory, depth, entries):
+        """Paths of the matching files among one directory's entries"""
+        count("listdir")
+        needs_stat = self.needs_stat()
+        found = []
+        for entry in entries:
+            try:
+                if not entry.is_file() or not self.name_matches(entry.name):
+                    continue
+                if needs_stat:
+                    count("stat")
+                    if not self.stat_matches(FileRecord.from_entry(entry)):
+                        continue
+            except OSError:
+                # The entry vanished between listing and stat
+                continue
+            found.append(entry.path)
+        return found
+
+    def sql_conditions(self, directory):
+        """WHERE conditions and parameters for the index's files table, below directory"""
+        conditions = []
+        parameters = []
+        if self.extensions is not None:
+            conditions.append(f"extension IN ({', '.join('?' * len(self.extensions))})")
+            parameters.extend(sorted(self.extensions))
+        if self.name is not None:
+            conditions.append("instr(name_lower, ?) > 0")
+            parameters.append(self.name)
+        for column, operator, value in (
+            ("size", ">=", self.min_size), ("size", "<=", self.max_size),
+            ("mtime", ">=", self.modified_after), ("mtime", "<=", self.modified_before),
+        ):
+            if value is not None:
+                conditions.append(f"{column} {operator} ?")
+                parameters.append(value)
+        if self.max_depth is not None:
+            # Depth of a file's directory below the query root, counted in separators
+            root = os.path.join(directory, "")
+            conditions.append(
+                "length(directory) - length(replace(directory, ?, '')) - ? <= ?"
+            )
+            parameters.extend([os.sep, root.count(os.sep) - 1, self.max_depth])
+        return conditions, parameters
+
+    def describe(self):
+        """Short human-readable summary, e.g. "pdf files of at least 10.0 MB"""
+        parts = []
+        if self.name is not None:
+            parts.append(f"named like '{self.name}'")
+        if self.min_size is not None:
+            parts.append(f"of at least {format_size(self.min_size)}")
+        if self.max_size is not None:
+            parts.append(f"of at most {format_size(self.max_size)}")
+        if self.modified_after is not None:
+            parts.append(f"modified after {datetime.fromtimestamp(self.modified_after):%Y-%m-%d}")
+        if self.modified_before is not None:
+            parts.append(f"modified before {datetime.fromtimestamp(self.modified_before):%Y-%m-%d}")
+        if self.max_depth == 0:
+            parts.append("outside subfolders")
+        elif self.max_depth is not None:
+            parts.append(f"at most {self.max_depth} folders deep")
+        kind = f"{', '.join(sorted(self.extensions))} files" if self.extensions else "files"
+        return " ".join([kind] + parts)
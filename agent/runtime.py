@@ -0,0 +1,44 @@
+from agent.memory import Memory
+from agent.understanding import Understanding
+from agent.planning import Planner
+from agent.execution import Executor
+from agent.watcher import WorkspaceWatcher
+from agent.instrumentation import Metrics
+
+class AgentRuntime:
+    """The agent components for one process, with an explicit start and close.
+
+    Memory, the file index and the Gemini client are expensive to build, so
+    front ends create one runtime and reuse it for every command.
+    """
+
+    def __init__(self, memory=None):
+        self.metrics = Metrics()
+        self.memory = memory or Memory()
+        self.understanding = Understanding(self.memory)
+        self.planner = Planner(self.memory)
+        self.executor = Executor(self.memory)
+        # Keep the file index current in the background so searches skip the disk
+        self.watcher = WorkspaceWatcher(self.executor.index, self.memory)
+        self.started = False
+        self.closed = False
+
+    def start(self):
+        """Start watching the workspaces"""
+        if not self.started:
+            self.watcher.start()
+            self.started = True
+        return self
+
+    def close(self):
+        """Stop the watcher, compact memory and release the index; safe to call twice"""
+        if self.closed:
+            return
+        self.closed = True
+        if self.started:
+            self.watcher.stop()
+        try:
+            self.memory.save_memory()
+        except OSError as e:
+            print(f"Error saving memory: {str(e)}")
+        self.executor.index.close()
@@ -1,112 +1,249 @@
 import os
+import asyncio
 import json
+import random
 import re
-import google.generativeai as genai
-from config import GOOGLE_API_KEY
+import time
+from concurrent.futures import Future
+from config import GEMINI_MODEL, LOCAL_PARSE_CONFIDENCE, SPECULATIVE_AUDIT_RATE, DEFAULT_WORKSPACE
+from agent.local_parser import LocalParser
+from agent.parse_cache import ParseCache, cache_fingerprint
+from agent.parse_stats import ParseStats
+from agent.instrumentation import current_trace
+
+# Prompt for the LLM, kept short since it is sent with every request
+SYSTEM_PROMPT = """
+Extract the intent and parameters from a file organization request.
+
+Intents:
+- organize_by_type: organize files by extension
+- organize_by_date: organize files by creation or modification date
+- organize_by_size: organize files by size
+- organize_by_keys: organize files into nested folders by several of type, date and size at once
+- find_files_by_type: find files of one type
+- find_file_by_name: find files by name or partial name
+- find_file_fuzzy: find files with names similar to a possibly misspelled name
+- find_duplicates: find files with identical content
+- find_files: find files matching several conditions, or any size, date, depth or count condition
+- undo_organize: move the files of the last organize run back where they were
+- unknown: the intent is unclear
+
+Parameters:
+- directory: "downloads", "desktop", "documents" or a path; leave it out for undo_organize unless a folder is named
+- file_type: for find_files_by_type, an extension such as pdf, jpg or txt
+- use_modified: for organize_by_date and organize_by_keys, true for modification date, false for creation date
+- filters: for find_files, any of name (part of the name), extensions (list), min_size and max_size (e.g. "10MB"), newer_than_days, older_than_days, modified_after and modified_before (YYYY-MM-DD), max_depth (0 = no subfolders) and limit
+- keys: for organize_by_keys, the keys in nesting order, e.g. ["type", "date"]
+- file_name: for find_file_by_name and find_file_fuzzy, the name to search for
+
+Reply with JSON only, e.g. {"intent": "find_files_by_type", "parameters": {"directory": "downloads", "file_type": "pdf"}}
+"""
 
 class Understanding:
-    def __init__(self, memory):
+    def __init__(self, memory, client=None):
         self.memory = memory
-        # Configure the Gemini API
-        genai.configure(api_key=GOOGLE_API_KEY)
+        self.local_parser = LocalParser()
+        # Cached parses are only valid for the prompt and model that produced them
+        self.cache = ParseCache(cache_fingerprint(SYSTEM_PROMPT, GEMINI_MODEL))
+        self.stats = ParseStats()
+        # The Gemini client is shared by the whole process and created on first use
+        self.client = client
+        
+    def _get_client(self):
+        """The Gemini client, configured once per process"""
+        if self.client is None:
+            from agent.llm_client import GeminiClient
+            self.client = GeminiClient.shared()
+        return self.client
         
     def parse_request(self, user_input):
-        """Parse user input into intent and parameters using Google's Gemini API"""
-        # Get recent actions to provide context
-        recent_actions = self.memory.get_recent_actions(3)
-        recent_context = ""
+        """Parse user input into intent and parameters.
         
-        if recent_actions:
-            recent_context = "Recent actions:"
-            for action in recent_actions:
-                recent_context += f"\n- {action['type']}: {json.dumps(action['details'])}"
-        
-        # Create prompt for the LLM
-        system_prompt = """
-        You are an AI assistant that helps with file organization tasks.
-        Your job is to analyze the user's request and extract the intent and parameters.
-        
-        Valid intents are:
-        1. organize_by_type - Organize files by their file extension
-        2. organize_by_date - Organize files by their creation or modification date
-        3. find_files_by_type - Find files of a specific type
-        4. find_file_by_name - Find a specific file by name or partial name
-        5. unknown - If you can't determine the intent
-        
-        Parameters to extract:
-        - directory: The directory to operate on (can be "downloads", "desktop", "documents", or a specific path)
-        - file_type: For find_files_by_type, the type of file to find (pdf, jpg, txt, etc.)
-        - use_modified: For organize_by_date, whether to use modification date (true) or creation date (false)
-        - file_name: For find_file_by_name, the name or partial name to search for
-        
-        Respond with a JSON object containing intent and parameters. ONLY respond with the JSON.
-        Example response: {"intent": "find_files_by_type", "parameters": {"directory": "downloads", "file_type": "pdf"}}
+        The local grammar answers when it is confident; otherwise Google's
+        Gemini API is asked and the two answers are reconciled.
         """
+        return self.start_parse(user_input).result()
         
-        user_message = f"""
-        User request: {user_input}
+    def start_parse(self, user_input):
+        """Start parsing and return a concurrent Future of the result.
         
-        {recent_context}
-        
-        Parse this request into intent and parameters.
+        The local grammar runs first. A confident local answer comes back
+        already resolved and the LLM is only asked for an audit sample;
+        otherwise the Future resolves once the LLM replies and both answers
+        have been reconciled.
         """
+        started = time.perf_counter()
+        # The LLM may finish on the client loop, outside this context
+        trace = current_trace()
+        
+        # Repeated requests are answered without another round trip
+        cached = self.cache.get(user_input)
+        if cached is not None:
+            self._record_latency(trace, "cache", time.perf_counter() - started)
+            self.stats.record_answer("cache")
+            return _resolved(cached)
+        
+        local_parse, confidence = self.local_parser.parse(user_input)
+        self._record_latency(trace, "local", time.perf_counter() - started)
         
+        if confidence >= LOCAL_PARSE_CONFIDENCE:
+            if random.random() < SPECULATIVE_AUDIT_RATE:
+                # Let a sample finish in the background to measure agreement
+                llm_future = self._start_llm(user_input)
+                if llm_future is not None:
+                    llm_future.add_done_callback(
+                        lambda future: self._audit(future, local_parse, confidence, started)
+                    )
+            self.stats.record_answer("local")
+            return _resolved(local_parse)
+        
+        llm_future = self._start_llm(user_input)
+        if llm_future is None:
+            self.stats.record_answer("local")
+            return _resolved(local_parse)
+        
+        return self.client.submit(self._finish(user_input, llm_future, local_parse, confidence, started, trace))
+        
+    async def parse_request_async(self, user_input):
+        """Parse user input from async code without blocking the event loop"""
+        return await asyncio.wrap_future(self.start_parse(user_input))
+        
+    def _start_llm(self, user_input):
+        """Send the request to the LLM; returns a Future, or None if it is unavailable"""
         try:
-            # Set up the model
-            model = genai.GenerativeModel('gemini-2.0-flash')
-            
-            # Create a chat session
-            chat = model.start_chat(history=[
-                {"role": "user", "parts": [system_prompt]},
-                {"role": "model", "parts": ["I understand. I'll extract the intent and parameters from user requests and respond with a JSON object."]}
-            ])
-            
-            # Get response from the model
-            response = chat.send_message(user_message)
-            content = response.text
-            
-            # Find JSON in the response
-            json_match = re.search(r'({[\s\S]*})', content)
-            
-            if json_match:
-                try:
-                    parsed_json = json.loads(json_match.group(1))
-                    # Validate the response
-                    if "intent" in parsed_json and "parameters" in parsed_json:
-                        return parsed_json
-                except json.JSONDecodeError:
-                    # Fallback to default parsing if JSON is invalid
-                    pass
-            
-            # Default fallback intent if LLM fails
-            return {
-                "intent": "unknown",
-                "parameters": {}
-            }
-            
+            client = self._get_client()
         except Exception as e:
             print(f"Error using Gemini API: {str(e)}")
-            # Fallback to a simple rule-based parsing as a backup
-            return self._fallback_parse(user_input)
-    
+            return None
+        return client.submit(self._ask_llm(user_input))
+        
+    async def _ask_llm(self, user_input):
+        """The LLM's parse of user input, or None if its reply is unusable"""
+        content = await self._get_client().generate_async(self._build_prompt(user_input))
+        return self._read_reply(content)
+        
+    async def _finish(self, user_input, llm_future, local_parse, confidence, started, trace=None):
+        """Wait for the LLM, reconcile its answer with the local parse and cache the result"""
+        try:
+            llm_parse = await asyncio.wrap_future(llm_future)
+        except Exception as e:
+            print(f"Error using Gemini API: {str(e)}")
+            self.stats.record_failure()
+            self.stats.record_answer("local")
+            if trace is not None:
+                trace.add_span("understand.fallback", time.perf_counter() - started)
+            # Fallback to the rule-based parse as a backup
+            return local_parse
+        
+        self._record_latency(trace, "llm", time.perf_counter() - started)
+        if llm_parse is None:
+            # The local guess beats giving up when the LLM reply is unusable
+            self.stats.record_answer("local")
+            if trace is not None:
+                trace.add_span("understand.fallback", time.perf_counter() - started)
+            return local_parse
+        
+        self.stats.record_comparison(confidence, local_parse, llm_parse)
+        self.stats.record_answer("llm")
+        parsed = self._reconcile(local_parse, llm_parse)
+        if self._cacheable(user_input, parsed):
+            self.cache.put(user_input, parsed)
+        return parsed
+        
+    def _cacheable(self, user_input, parsed):
+        """Whether an answer holds for this request text alone.
+        
+        The cache key is only the text, so an unknown answer (worth asking
+        again) and one whose directory the LLM took from recent actions
+        rather than the request, e.g. for "sort it by date", are not cached.
+        """
+        if parsed["intent"] == "unknown":
+            return False
+        if parsed["parameters"].get("directory") is None:
+            return True
+        return self.local_parser.extract_directory(user_input) is not None
+        
+    def _record_latency(self, trace, path, seconds):
+        """Latency of one parse path, in the stats and the command's trace"""
+        self.stats.record_latency(path, seconds)
+        if trace is not None:
+            trace.add_span(f"understand.{path}", seconds)
+        
+    def _audit(self, llm_future, local_parse, confidence, started):
+        """Compare a sampled LLM answer with the local one that was already returned"""
+        if llm_future.cancelled() or llm_future.exception() is not None:
+            return
+        self.stats.record_latency("llm", time.perf_counter() - started)
+        if llm_future.result() is not None:
+            self.stats.record_comparison(confidence, local_parse, llm_future.result())
+        
+    def _reconcile(self, local_parse, llm_parse):
+        """Merge both parses when the local one was not confident.
+        
+        The LLM decides the intent. When both agree on it, parameters only the
+        local grammar found (such as an explicit path) fill the gaps.
+        """
+        if llm_parse["intent"] == "unknown" and local_parse["intent"] != "unknown":
+            return local_parse
+        if llm_parse["intent"] != local_parse["intent"]:
+            return llm_parse
+        
+        parameters = dict(local_parse["parameters"])
+        parameters.update(llm_parse["parameters"])
+        return {"intent": llm_parse["intent"], "parameters": parameters}
+        
+    def get_parse_stats(self):
+        """Per-path latency and local/LLM agreement for threshold tuning"""
+        return self.stats.summary()
+        
+    def _build_prompt(self, user_input):
+        """System prompt, request and a compact summary of recent actions"""
+        prompt = f"{SYSTEM_PROMPT}\nRequest: {user_input}"
+        
+        # Get recent actions to provide context
+        recent_actions = self.memory.get_recent_actions(3)
+        if recent_actions:
+            prompt += "\nRecent actions:"
+            for action in recent_actions:
+                prompt += f"\n- {action['type']}: {json.dumps(action['details'], separators=(',', ':'))}"
+                
+        return prompt
+        
+    def _read_reply(self, content):
+        """Extract and validate the JSON in an LLM reply"""
+        # Find JSON in the response
+        json_match = re.search(r'({[\s\S]*})', content)
+        
+        if json_match:
+            try:
+                parsed_json = json.loads(json_match.group(1))
+                # Validate the response
+                if "intent" in parsed_json and "parameters" in parsed_json:
+                    return parsed_json
+            except json.JSONDecodeError:
+                # Fallback to default parsing if JSON is invalid
+                pass
+                
+        return None
+        
+    def likely_directory(self, user_input):
+        """Best guess at the target directory before the parse is known"""
+        local_parse, _ = self.local_parser.parse(user_input)
+        return local_parse["parameters"].get(
+            "directory",
+            self.memory.get_preference("last_directory", DEFAULT_WORKSPACE)
+        )
+        
+    def get_cache_stats(self):
+        """Parse cache counters, i.e. how many LLM round trips were avoided"""
+        return self.cache.stats()
+        
     def _fallback_parse(self, user_input):
-        """Simple rule-based parsing as fallback"""
-        user_input = user_input.lower()
-        
-        if "organize" in user_input or "sort" in user_input:
-            if "type" in user_input:
-                return {"intent": "organize_by_type", "parameters": {"directory": "downloads"}}
-            elif "date" in user_input:
-                return {"intent": "organize_by_date", "parameters": {"directory": "downloads", "use_modified": True}}
-        
-        elif "find" in user_input:
-            if "pdf" in user_input:
-                return {"intent": "find_files_by_type", "parameters": {"directory": "downloads", "file_type": "pdf"}}
-            
-            # Check for specific file name search
-            words = user_input.split()
-            for word in words:
-                if "." in word:
-                    return {"intent": "find_file_by_name", "parameters": {"directory": "downloads", "file_name": word}}
-        
-        return {"intent": "unknown", "parameters": {}}
\ No newline at end of file
+        """Rule-based parsing used when the Gemini API is unavailable"""
+        return self.local_parser.parse(user_input)[0]
+
+def _resolved(value):
+    """A Future that already holds value"""
+    future = Future()
+    future.set_result(value)
+    return future
\ No newline at end of file
@@ -0,0 +1,122 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from agent.instrumentation import count
+from agent.utils.file_helpers import FileRecord
+from agent.utils.walker import walk_tree
+from config import DUPLICATE_BLOCK_SIZE, DUPLICATE_WORKERS, WALK_WORKERS
+
+# Read size for full hashes; large reads let hashlib release the GIL for longer
+CHUNK_SIZE = 1024 * 1024
+
+def scan_sizes(directory, min_size=1, workers=WALK_WORKERS):
+    """FileRecords of every file of at least min_size below directory, from one fresh walk.
+
+    Sizes come straight from the disk: a file rewritten in place keeps its
+    directory's mtime, so sizes cached by the index can be stale.
+    """
+    def visit(path, depth, entries):
+        count("listdir")
+        records = []
+        for entry in entries:
+            try:
+                if entry.is_file(follow_symlinks=False):
+                    count("stat")
+                    record = FileRecord.from_entry(entry)
+                    if record.size >= min_size:
+                        records.append(record)
+            except OSError:
+                # The entry vanished between listing and stat
+                continue
+        return records
+
+    return [record for records in walk_tree(directory, visit, workers) for record in records]
+
+def partial_hash(path, size, block_size=DUPLICATE_BLOCK_SIZE):
+    """Hash of the first and last block of a file.
+
+    Files no larger than two blocks are read whole, so for them this is
+    already a full content hash.
+    """
+    digest = hashlib.blake2b()
+    with open(path, 'rb') as f:
+        if size <= 2 * block_size:
+            digest.update(f.read())
+        else:
+            digest.update(f.read(block_size))
+            f.seek(-block_size, os.SEEK_END)
+            digest.update(f.read(block_size))
+    return digest.hexdigest()
+
+def full_hash(path, chunk_size=CHUNK_SIZE):
+    """Hash of a file's whole content, read in fixed-size chunks into one buffer"""
+    digest = hashlib.blake2b()
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            digest.update(view[:read])
+    return digest.hexdigest()
+
+def _split_groups(groups, hasher, pool, errors):
+    """Split every group by hasher(record), keeping only groups of two or more"""
+    records = [record for group in groups for record in group]
+    keys = pool.map(lambda record: _safe(hasher, record, errors), records)
+
+    split = {}
+    for record, key in zip(records, keys):
+        if key is not None:
+            split.setdefault((record.size, key), []).append(record)
+    return [group for group in split.values() if len(group) > 1]
+
+def _safe(hasher, record, errors):
+    try:
+        return hasher(record)
+    except OSError as e:
+        # Unreadable or vanished files cannot be compared
+        errors.append({"file": record.path, "error": str(e)})
+        return None
+
+def find_duplicate_groups(records, workers=DUPLICATE_WORKERS, block_size=DUPLICATE_BLOCK_SIZE):
+    """Group FileRecords with identical content.
+
+    records are narrowed in stages: same size, then the same first and last
+    blocks, and only the files still matching are hashed in full. Hard links
+    to one inode are counted once, since they take no extra space.
+
+    Returns (groups, stats, errors): lists of records sorted by size, largest
+    first; how many files reached each stage; and files that could not be read.
+    """
+    by_size = {}
+    seen_links = set()
+    for record in records:
+        if record.inode:
+            # Hard links share both; different devices rarely share both
+            if (record.size, record.inode) in seen_links:
+                continue
+            seen_links.add((record.size, record.inode))
+        by_size.setdefault(record.size, []).append(record)
+    groups = [group for group in by_size.values() if len(group) > 1]
+
+    stats = {"same_size": sum(len(group) for group in groups)}
+    errors = []
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        groups = _split_groups(
+            groups, lambda record: partial_hash(record.path, record.size, block_size), pool, errors
+        )
+        stats["partial_hashed"] = stats["same_size"]
+
+        # Small files were read whole by the partial hash and are settled
+        settled = [group for group in groups if group[0].size <= 2 * block_size]
+        pending = [group for group in groups if group[0].size > 2 * block_size]
+        stats["full_hashed"] = sum(len(group) for group in pending)
+        groups = settled + _split_groups(pending, lambda record: full_hash(record.path), pool, errors)
+
+    for group in groups:
+        group.sort(key=lambda record: record.path)
+    groups.sort(key=lambda group: (-group[0].size, group[0].path))
+    return groups, stats, errors
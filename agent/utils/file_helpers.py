@@ -1,10 +1,45 @@
+import errno
 import os
 import shutil
+import sys
 from datetime import datetime
 from pathlib import Path
 
+class FileRecord:
+    """A file found by a directory scan, carrying the stat fields we use"""
+    __slots__ = ("path", "name", "size", "mtime", "ctime", "inode")
+    
+    def __init__(self, path, name, size, mtime, ctime, inode):
+        self.path = path
+        self.name = name
+        self.size = size
+        self.mtime = mtime
+        self.ctime = ctime
+        self.inode = inode
+    
+    @classmethod
+    def from_entry(cls, entry):
+        """Build a record from an os.DirEntry with a single stat"""
+        stat = entry.stat()
+        return cls(entry.path, entry.name, stat.st_size, stat.st_mtime, stat.st_ctime, stat.st_ino)
+    
+    @classmethod
+    def from_path(cls, path):
+        """Build a record for a single path"""
+        stat = os.stat(path)
+        return cls(path, os.path.basename(path), stat.st_size, stat.st_mtime, stat.st_ctime, stat.st_ino)
+    
+    def __repr__(self):
+        return f"FileRecord({self.path!r})"
+
+def _as_record(file):
+    """Accept either a FileRecord or a path"""
+    return file if isinstance(file, FileRecord) else FileRecord.from_path(file)
+
 def get_file_type(file_path):
     """Get file type from extension"""
+    if isinstance(file_path, FileRecord):
+        file_path = file_path.name
     extension = os.path.splitext(file_path)[1].lower().lstrip('.')
     if not extension:
         return "no_extension"
@@ -12,7 +47,7 @@ def get_file_type(file_path):
 
 def get_file_size_category(file_path):
     """Categorize file by size"""
-    size_bytes = os.path.getsize(file_path)
+    size_bytes = _as_record(file_path).size
     if size_bytes < 1024 * 100:  # Less than 100KB
         return "tiny"
     elif size_bytes < 1024 * 1024:  # Less than 1MB
@@ -24,15 +59,21 @@ def get_file_size_category(file_path):
     else:
         return "huge"
 
-def get_file_date_category(file_path, use_modified=True):
+def format_size(size_bytes):
+    """Human-readable size, e.g. 1.5 MB"""
+    for unit in ["bytes", "KB", "MB", "GB"]:
+        if size_bytes < 1024 or unit == "GB":
+            return f"{size_bytes} {unit}" if unit == "bytes" else f"{size_bytes:.1f} {unit}"
+        size_bytes /= 1024
+
+def get_file_date_category(file_path, use_modified=True, now=None):
     """Categorize file by date (created or modified)"""
-    if use_modified:
-        timestamp = os.path.getmtime(file_path)
-    else:
-        timestamp = os.path.getctime(file_path)
+    record = _as_record(file_path)
+    timestamp = record.mtime if use_modified else record.ctime
     
     file_date = datetime.fromtimestamp(timestamp)
-    now = datetime.now()
+    if now is None:
+        now = datetime.now()
     
     if file_date.year < now.year:
         return f"{file_date.year}"
@@ -43,30 +84,132 @@ def get_file_date_category(file_path, use_modified=True):
     else:
         return "this_week"
 
-def list_files_in_directory(directory):
-    """List all files (not directories) in a directory"""
-    return [os.path.join(directory, f) for f in os.listdir(directory) 
-            if os.path.isfile(os.path.join(directory, f))]
+def scan_files(directory):
+    """Yield a FileRecord for every file (not directory) in a directory"""
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            try:
+                if entry.is_file():
+                    yield FileRecord.from_entry(entry)
+            except OSError:
+                # The entry vanished between listing and stat
+                continue
 
 def safe_create_directory(directory):
     """Create directory if it doesn't exist"""
     os.makedirs(directory, exist_ok=True)
     return directory
 
-def safe_move_file(source, destination):
-    """Move file with conflict resolution"""
-    if not os.path.exists(destination):
-        os.makedirs(os.path.dirname(destination), exist_ok=True)
-        shutil.move(source, destination)
+def move_file(source, destination, same_device=None):
+    """Move file to destination, raising FileExistsError if that name is taken.
+    
+    Pass same_device when the caller already knows whether source and
+    destination share a file system; otherwise it is looked up.
+    """
+    if same_device is None:
+        same_device = os.stat(source).st_dev == os.stat(os.path.dirname(destination)).st_dev
+    if same_device:
+        # No data is copied
+        _link_into_place(source, destination)
         return destination
+    return copy_move_file(source, destination)
+
+# Errors meaning the file system cannot hard link this file
+_LINK_UNSUPPORTED = {errno.EPERM, errno.EACCES, errno.ENOSYS, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EMLINK, errno.EXDEV}
+
+def _link_into_place(source, destination):
+    """Rename source to destination without ever replacing a file already there.
+    
+    os.rename silently replaces an existing destination on POSIX, while a
+    hard link fails with EEXIST, so the new name is linked first and the
+    old one removed after. File systems without hard links fall back to a
+    rename after checking the name is free.
+    """
+    try:
+        os.link(source, destination, follow_symlinks=False)
+    except FileExistsError:
+        raise
+    except (OSError, NotImplementedError) as e:
+        if isinstance(e, OSError) and e.errno not in _LINK_UNSUPPORTED:
+            raise
+        if os.path.lexists(destination):
+            raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), destination)
+        os.rename(source, destination)
+        return
+    os.unlink(source)
+
+# Ends the temporary name a cross-device copy is written under
+PARTIAL_SUFFIX = ".partial"
+
+def leftover_partials(directory, names):
+    """Temporary copies in directory left by interrupted moves to any of names, as name -> paths"""
+    found = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not (entry.name.startswith(".") and entry.name.endswith(PARTIAL_SUFFIX)):
+                continue
+            name, _, pid = entry.name[1:-len(PARTIAL_SUFFIX)].rpartition(".")
+            if name in names and pid.isdigit():
+                found.setdefault(name, []).append(entry.path)
+    return found
+
+def copy_move_file(source, destination):
+    """Move a file across file systems: kernel-side copy, metadata, then delete.
     
-    # Handle name conflict
-    base, extension = os.path.splitext(destination)
-    counter = 1
-    while os.path.exists(destination):
-        destination = f"{base}_{counter}{extension}"
-        counter += 1
+    The copy is written under a temporary name and linked into place, so
+    an interrupted move never leaves a truncated file at destination and
+    a file that took the name meanwhile is never replaced.
+    """
+    target_dir, name = os.path.split(destination)
+    temp_file = os.path.join(target_dir, f".{name}.{os.getpid()}{PARTIAL_SUFFIX}")
+    try:
+        with open(source, 'rb') as src, open(temp_file, 'wb') as dst:
+            _copy_contents(src, dst, os.fstat(src.fileno()).st_size)
+        shutil.copystat(source, temp_file)
+        _link_into_place(temp_file, destination)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.unlink(temp_file)
+        raise
+    os.unlink(source)
+    return destination
+
+def _copy_contents(src, dst, size):
+    """Copy an open file, letting the kernel move the bytes where it can"""
+    infd, outfd = src.fileno(), dst.fileno()
+    copied = 0
+    
+    # copy_file_range can reflink or copy server-side; older kernels refuse
+    # to cross file systems, in which case sendfile still avoids user space
+    for kernel_copy in (_copy_file_range, _sendfile):
+        try:
+            while copied < size:
+                sent = kernel_copy(infd, outfd, copied, size - copied)
+                if sent == 0:
+                    break
+                copied += sent
+            if copied >= size:
+                return
+        except (AttributeError, OSError) as e:
+            if isinstance(e, OSError) and e.errno not in _KERNEL_COPY_UNSUPPORTED:
+                raise
+            if copied:
+                # Partially copied through this path; finish in user space
+                break
     
-    os.makedirs(os.path.dirname(destination), exist_ok=True)
-    shutil.move(source, destination)
-    return destination
\ No newline at end of file
+    src.seek(copied)
+    dst.seek(copied)
+    shutil.copyfileobj(src, dst, 1024 * 1024)
+
+# Errors meaning a kernel copy call cannot be used for this pair of files
+_KERNEL_COPY_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF}
+
+def _copy_file_range(infd, outfd, offset, count):
+    return os.copy_file_range(infd, outfd, count, offset, offset)
+
+def _sendfile(infd, outfd, offset, count):
+    # Only Linux accepts a regular file as the sendfile destination
+    if not sys.platform.startswith("linux"):
+        raise AttributeError("sendfile to a file is not supported here")
+    os.lseek(outfd, offset, os.SEEK_SET)
+    return os.sendfile(outfd, infd, offset, count)
\ No newline at end of file
@@ -0,0 +1,69 @@
+import heapq
+import os
+import re
+
+_TOKEN_SPLIT = re.compile(r"[\s_\-.()\[\]]+")
+
+def bounded_edit_distance(a, b, max_distance):
+    """Levenshtein distance between a and b, or None if it exceeds max_distance.
+
+    Only a diagonal band of width 2 * max_distance + 1 is computed and the
+    scan stops as soon as every cell in a row is over the bound.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return None
+    if a == b:
+        return 0
+    if len(a) > len(b):
+        a, b = b, a
+
+    too_far = max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        low = max(1, i - max_distance)
+        high = min(len(b), i + max_distance)
+        current = [too_far] * (len(b) + 1)
+        current[0] = i if i <= max_distance else too_far
+        best = current[0]
+        for j in range(low, high + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            current[j] = value if value < too_far else too_far
+            if current[j] < best:
+                best = current[j]
+        if best > max_distance:
+            return None
+        previous = current
+
+    distance = previous[len(b)]
+    return distance if distance <= max_distance else None
+
+def name_distance(query, name, max_distance):
+    """Smallest edit distance between query and a name, its stem or one of its words"""
+    stem = os.path.splitext(name)[0]
+    targets = {name, stem}
+    targets.update(token for token in _TOKEN_SPLIT.split(stem) if token)
+
+    best = None
+    for target in targets:
+        distance = bounded_edit_distance(query, target, max_distance if best is None else best)
+        if distance is not None and (best is None or distance < best):
+            best = distance
+            if best == 0:
+                break
+    return best
+
+def rank_matches(query, candidates, max_distance, limit):
+    """Return the closest (path, distance) pairs, best first.
+
+    candidates are (path, lowercased name, shared trigram count) tuples; ties
+    on distance go to the name sharing more trigrams, then the shorter name.
+    """
+    query = query.lower()
+    scored = []
+    for path, name_lower, shared in candidates:
+        distance = name_distance(query, name_lower, max_distance)
+        if distance is not None:
+            scored.append((distance, -shared, len(name_lower), path))
+
+    return [(path, distance) for distance, _, _, path in heapq.nsmallest(limit, scored)]
\ No newline at end of file
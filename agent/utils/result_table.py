@@ -0,0 +1,81 @@
+import os
+
+class ResultTable:
+    """Column-oriented rows for a large result set, filtered, sorted and paged server side.
+
+    Only the rows of the requested page are ever materialized, so a front end
+    can show 100k results while sending a single page to the browser.
+    """
+
+    def __init__(self, columns, data):
+        self.columns = list(columns)
+        # Column name -> list of values, all of the same length
+        self.data = {column: list(data[column]) for column in self.columns}
+        self.size = len(self.data[self.columns[0]]) if self.columns else 0
+        self._haystack = None
+        self._last_view = None
+
+    @classmethod
+    def from_paths(cls, paths, **extra_columns):
+        """Name and Folder columns for a list of paths, plus any extra columns"""
+        data = {
+            "Name": [os.path.basename(path) for path in paths],
+            "Folder": [os.path.dirname(path) for path in paths],
+        }
+        data.update(extra_columns)
+        return cls(list(extra_columns) + ["Name", "Folder"], data)
+
+    def __len__(self):
+        return self.size
+
+    def distinct(self, column):
+        """Sorted distinct values of a column with their row counts"""
+        counts = {}
+        for value in self.data[column]:
+            counts[value] = counts.get(value, 0) + 1
+        return dict(sorted(counts.items()))
+
+    def view(self, query="", sort_by=None, descending=False, where=None):
+        """Row numbers matching query (and column == value for every item in where), in order.
+
+        The last view is remembered, so paging through it costs nothing.
+        """
+        where = tuple(sorted((where or {}).items()))
+        key = (query.strip().lower(), sort_by, descending, where)
+        if self._last_view is not None and self._last_view[0] == key:
+            return self._last_view[1]
+
+        rows = range(self.size)
+        for column, value in where:
+            values = self.data[column]
+            rows = [row for row in rows if values[row] == value]
+        if key[0]:
+            haystack = self._search_text()
+            rows = [row for row in rows if key[0] in haystack[row]]
+        rows = list(rows)
+
+        if sort_by is not None:
+            values = self.data[sort_by]
+            if values and isinstance(values[0], str):
+                rows.sort(key=lambda row: values[row].lower(), reverse=descending)
+            else:
+                rows.sort(key=lambda row: values[row], reverse=descending)
+
+        self._last_view = (key, rows)
+        return rows
+
+    def page(self, rows, page, page_size):
+        """Columns for one zero-based page of rows, ready for a table widget"""
+        visible = rows[page * page_size:(page + 1) * page_size]
+        return {column: [self.data[column][row] for row in visible] for column in self.columns}
+
+    def _search_text(self):
+        """Lower-cased text of every row, built on the first filtered view"""
+        if self._haystack is None:
+            text_columns = [self.data[column] for column in self.columns
+                            if self.size and isinstance(self.data[column][0], str)]
+            if text_columns:
+                self._haystack = ["\0".join(values).lower() for values in zip(*text_columns)]
+            else:
+                self._haystack = [""] * self.size
+        return self._haystack
@@ -0,0 +1,215 @@
+import contextvars
+import os
+import queue
+import threading
+from collections import deque
+from config import WALK_WORKERS
+
+# Marks a directory that produced no result, e.g. one that could not be listed
+SKIP = object()
+
+def parallel_walk(root, expand, workers=WALK_WORKERS, ordered=False):
+    """Expand a directory tree from root on several threads, yielding the results.
+
+    expand(directory, depth) runs on a worker thread and returns
+    (result, subdirectories); the subdirectories are expanded in turn and
+    results that are SKIP are not yielded. Listing latency dominates on
+    network file systems, so workers overlap those round trips.
+
+    Each worker takes directories from the end of its own queue, staying
+    deep in one subtree, and steals from the front of another worker's queue
+    when its own runs dry, taking the biggest unexplored subtrees. Results
+    stream in completion order, or with ordered=True in the pre-order a
+    single-threaded walk would give, released as soon as their turn comes.
+    An exception from expanding root, or any non-OSError from expand, is
+    raised to the caller. Closing the generator early stops the workers.
+    """
+    if workers <= 1:
+        yield from _serial_walk(root, expand)
+        return
+
+    walk = _Walk(expand, max(1, workers))
+    walk.push(0, (root, 0, ()))
+    threads = [
+        threading.Thread(target=contextvars.copy_context().run, args=(walk.work, number), daemon=True)
+        for number in range(walk.workers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        results = walk.ordered_results() if ordered else walk.results()
+        for result in results:
+            if result is not SKIP:
+                yield result
+    finally:
+        walk.cancel()
+        for thread in threads:
+            thread.join()
+
+def _serial_walk(root, expand):
+    """Depth-first pre-order walk on the calling thread"""
+    pending = [(root, 0)]
+    while pending:
+        directory, depth = pending.pop()
+        try:
+            result, subdirectories = expand(directory, depth)
+        except OSError:
+            if directory == root:
+                raise
+            continue
+        if result is not SKIP:
+            yield result
+        # Reversed so subdirectories are visited in the order expand gave them
+        pending.extend((path, depth + 1) for path in reversed(subdirectories))
+
+class _Walk:
+    """Shared state of one parallel walk"""
+
+    def __init__(self, expand, workers):
+        self.expand = expand
+        self.workers = workers
+        # One deque per worker, all guarded by condition
+        self.queues = [deque() for _ in range(workers)]
+        self.condition = threading.Condition()
+        # Directories queued or being expanded; the walk is over at zero
+        self.pending = 0
+        self.cancelled = False
+        # (key, result, subdirectory count), or an exception to re-raise
+        self.finished = queue.Queue()
+
+    def push(self, number, task):
+        with self.condition:
+            self.pending += 1
+            self.queues[number].append(task)
+            self.condition.notify()
+
+    def _take(self, number):
+        """The next directory for a worker, stealing if its own queue is empty"""
+        try:
+            return self.queues[number].pop()
+        except IndexError:
+            pass
+        for offset in range(1, self.workers):
+            try:
+                return self.queues[(number + offset) % self.workers].popleft()
+            except IndexError:
+                continue
+        return None
+
+    def work(self, number):
+        while True:
+            with self.condition:
+                task = self._take(number)
+                while task is None and self.pending and not self.cancelled:
+                    self.condition.wait()
+                    task = self._take(number)
+                if task is None or self.cancelled:
+                    return
+
+            directory, depth, key = task
+            try:
+                result, subdirectories = self.expand(directory, depth)
+            except OSError as e:
+                # Unreadable subdirectories are skipped, like a permission-denied listing
+                if depth == 0:
+                    self.finished.put(e)
+                result, subdirectories = SKIP, []
+            except BaseException as e:
+                self.finished.put(e)
+                result, subdirectories = SKIP, []
+
+            # Pushed in reverse so this worker continues with the first one
+            for position in reversed(range(len(subdirectories))):
+                self.push(number, (subdirectories[position], depth + 1, key + (position,)))
+            self.finished.put((key, result, len(subdirectories)))
+
+            with self.condition:
+                self.pending -= 1
+                if not self.pending:
+                    self.condition.notify_all()
+                    self.finished.put(None)
+
+    def cancel(self):
+        with self.condition:
+            self.cancelled = True
+            self.condition.notify_all()
+
+    def results(self):
+        """Results in completion order"""
+        for _, result, _ in self._finished_items():
+            yield result
+
+    def ordered_results(self):
+        """Results in pre-order, each released once everything before it is"""
+        # key -> result, and key -> subdirectory count for the visited directories
+        done = {}
+        children = {}
+        cursor = ()
+        for key, result, subdirectories in self._finished_items():
+            done[key] = result
+            children[key] = subdirectories
+            while cursor is not None and cursor in done:
+                yield done.pop(cursor)
+                cursor = self._next_key(cursor, children)
+
+    def _finished_items(self):
+        while True:
+            item = self.finished.get()
+            if item is None:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    @staticmethod
+    def _next_key(key, children):
+        """The key after key in pre-order, or None at the end of the tree"""
+        if children[key]:
+            return key + (0,)
+        while key:
+            parent = key[:-1]
+            if key[-1] + 1 < children[parent]:
+                return parent + (key[-1] + 1,)
+            key = parent
+        return None
+
+def walk_tree(root, visit, workers=WALK_WORKERS, ordered=False, max_depth=None, follow_symlinks=False):
+    """Yield visit(directory, depth, entries) for every directory below root.
+
+    visit gets the os.DirEntry list of each directory on a worker thread, so
+    per-entry work such as stat calls is spread across the workers too.
+    Subtrees deeper than max_depth are not listed (root has depth 0). With
+    follow_symlinks, each directory is entered once however many links lead
+    to it, so symlink loops end.
+    """
+    seen = set()
+    seen_lock = threading.Lock()
+
+    def first_visit(path):
+        stat_result = os.stat(path)
+        with seen_lock:
+            if (stat_result.st_dev, stat_result.st_ino) in seen:
+                return False
+            seen.add((stat_result.st_dev, stat_result.st_ino))
+            return True
+
+    def expand(directory, depth):
+        with os.scandir(directory) as iterator:
+            entries = list(iterator)
+        subdirectories = []
+        if max_depth is None or depth < max_depth:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=follow_symlinks) and (
+                        not follow_symlinks or first_visit(entry.path)
+                    ):
+                        subdirectories.append(entry.path)
+                except OSError:
+                    # The entry vanished, or is a link to nowhere
+                    continue
+        return visit(directory, depth, entries), subdirectories
+
+    if follow_symlinks:
+        first_visit(root)
+    return parallel_walk(root, expand, workers, ordered)
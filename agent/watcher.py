@@ -0,0 +1,183 @@
+import os
+import threading
+import time
+from watchdog.observers import Observer
+from watchdog.events import FileSystemEventHandler
+from config import DEFAULT_WORKSPACE, WATCH_DEBOUNCE_SECONDS, WATCH_MAX_BATCH, WATCH_MAX_DELAY_INTERVALS
+
+class _CatalogEventHandler(FileSystemEventHandler):
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def on_created(self, event):
+        self.watcher.queue_sync(event.src_path)
+
+    def on_modified(self, event):
+        # Directory modifications only mean a child changed; the child has its own event
+        if not event.is_directory:
+            self.watcher.queue_sync(event.src_path)
+
+    def on_deleted(self, event):
+        self.watcher.queue_delete(event.src_path)
+
+    def on_moved(self, event):
+        self.watcher.queue_delete(event.src_path)
+        self.watcher.queue_sync(event.dest_path)
+
+class WorkspaceWatcher:
+    def __init__(self, index, memory, debounce=WATCH_DEBOUNCE_SECONDS, max_batch=WATCH_MAX_BATCH):
+        self.index = index
+        self.memory = memory
+        self.debounce = debounce
+        self.max_batch = max_batch
+        self.max_delay = debounce * WATCH_MAX_DELAY_INTERVALS
+        self.observer = None
+        self.watches = {}
+        # path -> "sync" or "delete"; the latest event for a path wins
+        self.pending = {}
+        self.first_event = 0.0
+        self.last_event = 0.0
+        self.pending_lock = threading.Lock()
+        # Held while a batch is applied, so flush() returns only once the index is current
+        self.flush_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        # Set when the workspaces should be checked again on the watcher thread
+        self.resync = threading.Event()
+        # Roots that could not be watched; they are scanned on disk like any directory
+        self.unwatchable = set()
+        self.flusher = None
+
+    def workspaces(self):
+        """Directories to watch: the default workspace and the last used directory"""
+        candidates = [DEFAULT_WORKSPACE, self.memory.get_preference("last_directory")]
+        roots = []
+        for candidate in candidates:
+            if not candidate or not os.path.isdir(candidate):
+                continue
+            candidate = os.path.abspath(candidate)
+            if candidate not in roots:
+                roots.append(candidate)
+
+        # A recursive watch already covers nested workspaces
+        return [
+            root for root in roots
+            if not any(other != root and root.startswith(os.path.join(other, "")) for other in roots)
+        ]
+
+    def start(self):
+        """Start watching the workspaces; they are indexed in the background"""
+        self.observer = Observer()
+        self.observer.daemon = True
+        self.observer.start()
+        self.stopping.clear()
+        self.flusher = threading.Thread(target=self._flush_loop, name="workspace-watcher", daemon=True)
+        self.flusher.start()
+        self.sync_workspaces()
+
+    def sync_workspaces(self):
+        """Follow changes to the watched workspaces, e.g. a new last_directory, in the background"""
+        if self.observer is None:
+            return
+        self.resync.set()
+        self.wakeup.set()
+
+    def _sync_workspaces(self):
+        """Watch new workspaces and drop old ones; runs on the watcher thread"""
+        roots = self.workspaces()
+        self.unwatchable.intersection_update(roots)
+        for root in list(self.watches):
+            if root not in roots:
+                self.index.unmark_watched(root)
+                self.observer.unschedule(self.watches.pop(root))
+
+        for root in roots:
+            if root in self.watches or root in self.unwatchable:
+                continue
+            try:
+                # Schedule first so no event is lost while the initial scan runs
+                self.watches[root] = self.observer.schedule(
+                    _CatalogEventHandler(self), root, recursive=True
+                )
+                self.index.refresh(root, recursive=True)
+            except OSError as e:
+                # E.g. the inotify watch limit; the root is then scanned on demand
+                print(f"Error watching {root}: {str(e)}")
+                self.unwatchable.add(root)
+                watch = self.watches.pop(root, None)
+                if watch is not None:
+                    self.observer.unschedule(watch)
+                continue
+            self.index.mark_watched(root, self.flush)
+
+    def stop(self):
+        """Stop watching and commit whatever is still pending"""
+        if self.observer is None:
+            return
+
+        self.stopping.set()
+        self.wakeup.set()
+        self.flusher.join()
+        self.observer.stop()
+        self.observer.join()
+        self.flush()
+
+        for root in self.watches:
+            self.index.unmark_watched(root)
+        self.watches = {}
+        self.observer = None
+
+    def queue_sync(self, path):
+        """Record that path was created or changed"""
+        self._queue(path, "sync")
+
+    def queue_delete(self, path):
+        """Record that path is gone"""
+        self._queue(path, "delete")
+
+    def _queue(self, path, operation):
+        with self.pending_lock:
+            if not self.pending:
+                self.first_event = time.monotonic()
+            self.pending[os.path.abspath(path)] = operation
+            self.last_event = time.monotonic()
+            full = len(self.pending) >= self.max_batch
+        if full:
+            self.wakeup.set()
+
+    def _flush_loop(self):
+        """Commit batches once events are quiet, the batch is full or the oldest event waited too long"""
+        while not self.stopping.is_set():
+            self.wakeup.wait(self.debounce)
+            self.wakeup.clear()
+
+            if self.resync.is_set():
+                self.resync.clear()
+                self._sync_workspaces()
+
+            with self.pending_lock:
+                if not self.pending:
+                    continue
+                now = time.monotonic()
+                quiet = now - self.last_event >= self.debounce
+                overdue = now - self.first_event >= self.max_delay
+                if not quiet and not overdue and len(self.pending) < self.max_batch:
+                    continue
+
+            self.flush()
+
+    def flush(self):
+        """Apply all pending events to the index in one transaction"""
+        with self.flush_lock:
+            with self.pending_lock:
+                batch, self.pending = self.pending, {}
+
+            if not batch:
+                return
+
+            synced = [path for path, operation in batch.items() if operation == "sync"]
+            deleted = [path for path, operation in batch.items() if operation == "delete"]
+            try:
+                self.index.apply_changes(synced, deleted)
+            except Exception as e:
+                print(f"Error updating file index: {str(e)}")
\ No newline at end of file
@@ -1,20 +1,18 @@
 import streamlit as st
+import atexit
+import math
 import os
 import json
 import time
 from pathlib import Path
 
-from agent.memory import Memory
-from agent.understanding import Understanding
-from agent.planning import Planner
-from agent.execution import Executor
-from config import DEFAULT_WORKSPACE
-
-# Initialize the agent components
-memory = Memory()
-understanding = Understanding(memory)
-planner = Planner(memory)
-executor = Executor(memory)
+from agent.runtime import AgentRuntime
+from agent.instrumentation import span
+from agent.progress import Progress
+from agent.move_results import MoveResults
+from agent.utils.result_table import ResultTable
+from agent.utils.file_helpers import format_size
+from config import DEFAULT_WORKSPACE, RESULT_PAGE_SIZE
 
 # Page setup
 st.set_page_config(
@@ -23,96 +21,126 @@ st.set_page_config(
     layout="wide"
 )
 
-# App title and description
-st.title("📁 File Organization Agent")
-st.markdown("""
-This tool helps you organize and find files using simple natural language commands.
-Simply tell the agent what you want to do, and it will handle the rest.
-""")
+@st.cache_resource(show_spinner=False)
+def get_runtime():
+    """Agent components shared by every rerun and session of this server process"""
+    runtime = AgentRuntime().start()
+    atexit.register(runtime.close)
+    return runtime
 
-# Sidebar for agent memory and settings
-with st.sidebar:
-    st.header("Agent Memory")
-    
-    # Show recent actions
-    recent_actions = memory.get_recent_actions(5)
-    if recent_actions:
-        st.subheader("Recent Actions")
-        for action in recent_actions:
-            with st.expander(f"{action['type']} - {action['timestamp'][:16]}"):
-                st.json(action['details'])
-    else:
-        st.info("No actions recorded yet.")
-    
-    # Settings
-    st.subheader("Settings")
-    
-    # Display current workspace
-    current_workspace = memory.get_preference("last_directory", DEFAULT_WORKSPACE)
-    st.text_input("Current Workspace", current_workspace, disabled=True)
-    
-    # Option to change workspace
-    new_workspace = st.text_input("Change Workspace (leave empty to keep current)")
-    if new_workspace:
-        if os.path.exists(new_workspace):
-            memory.update_preference("last_directory", new_workspace)
-            st.success(f"Workspace updated to: {new_workspace}")
-            st.experimental_rerun()
-        else:
-            st.error("Directory does not exist.")
-    
-    # Debug mode toggle
-    debug_mode = st.toggle("Developer Mode", value=False, 
-                          help="Show technical details like parsing and planning")
+# Streamlit reruns this script on every interaction; the components are built once
+runtime = get_runtime()
+memory = runtime.memory
+understanding = runtime.understanding
+planner = runtime.planner
+executor = runtime.executor
 
-# Main interaction area
-st.header("What would you like me to do?")
+# Organize actions -> table column and result field naming each file's new folder
+ORGANIZE_ACTIONS = {
+    "organize_by_type": ("Type", "type"),
+    "organize_by_date": ("Date", "date_category"),
+    "organize_by_size": ("Size", "size_category"),
+    "organize_by_keys": ("Folder", "folder")
+}
 
-# Input box for user command
-user_input = st.text_input("Enter your request", 
-                          placeholder="E.g., 'organize my downloads by file type' or 'find PDFs in documents'")
+def run_command(user_input, dry_run):
+    """Understand, plan and execute a request, keeping the outcome in session state"""
+    # A new id per command gives its table widgets fresh state
+    command_id = st.session_state.get("command_count", 0) + 1
+    st.session_state["command_count"] = command_id
+    command = {
+        "id": command_id,
+        "input": user_input,
+        "dry_run": dry_run,
+        "parsed_request": None,
+        "plan": None,
+        "move_plan": None,
+        "result": None,
+        "table": None,
+        "error": None,
+        "trace": None
+    }
+    st.session_state["last_command"] = command
+    
+    # Time every phase for Developer Mode and the metrics file
+    with runtime.metrics.trace("command", input=user_input) as trace:
+        execute_command(command)
+    command["trace"] = trace.to_dict()
 
-# Process user input when submitted
-if user_input:
-    # Create a status area
-    status_container = st.empty()
+def execute_command(command):
+    """The understand, plan and execute phases of run_command"""
+    user_input = command["input"]
+    dry_run = command["dry_run"]
     
-    # Process the request without showing technical details
-    with status_container.container():
-        st.info("Processing your request...")
-        
-        # Understanding phase
-        parsed_request = understanding.parse_request(user_input)
+    with st.spinner("Processing your request..."):
+        # Understanding phase, warming up the likely target while the LLM works
+        with span("understand"):
+            pending = understanding.start_parse(user_input)
+            if not pending.done():
+                executor.prewarm(planner.resolve_directory(understanding.likely_directory(user_input)))
+            command["parsed_request"] = pending.result()
         
         # Planning phase
-        plan = planner.create_plan(parsed_request)
-        
-        # Only show the technical details if debug mode is on
-        if debug_mode:
-            col1, col2 = st.columns(2)
-            with col1:
-                st.subheader("Understanding")
-                st.json(parsed_request)
-            with col2:
-                st.subheader("Planning")
-                st.json(plan)
+        plan = planner.create_plan(command["parsed_request"])
+        command["plan"] = plan
     
-    # Clear the status message
-    status_container.empty()
+    # Preview organize plans without touching any files
+    if dry_run and plan["action"] in ORGANIZE_ACTIONS:
+        with st.spinner(f"Planning: {plan['description']}..."):
+            try:
+                command["move_plan"] = executor.preview_moves(plan)
+                command["table"] = build_result_table(plan, None, command["move_plan"])
+            except Exception as e:
+                command["error"] = f"Error while planning: {str(e)}"
     
     # Execute immediately if we understand the request
-    if plan["action"] != "unknown":
+    elif plan["action"] != "unknown":
+        # Organize runs and filtered searches report each file to a live bar
+        progress_bar = None
+        progress = None
+        if plan["action"] in ORGANIZE_ACTIONS or plan["action"] in ("find_files", "undo_organize"):
+            progress_bar = st.progress(0.0, text=f"Executing: {plan['description']}...")
+            progress = Progress(lambda progress: show_progress(progress_bar, progress))
+        
         with st.spinner(f"Executing: {plan['description']}..."):
             try:
                 # Execute the plan based on the action type
                 if plan["action"] == "organize_by_type":
-                    result = executor.organize_by_type(plan["directory"])
+                    result = executor.organize_by_type(
+                        plan["directory"],
+                        plan["parallel"],
+                        plan["workers"],
+                        progress
+                    )
                     memory.update_preference("last_directory", plan["directory"])
                     
                 elif plan["action"] == "organize_by_date":
                     result = executor.organize_by_date(
                         plan["directory"],
-                        plan["use_modified"]
+                        plan["use_modified"],
+                        plan["parallel"],
+                        plan["workers"],
+                        progress
+                    )
+                    memory.update_preference("last_directory", plan["directory"])
+                    
+                elif plan["action"] == "organize_by_size":
+                    result = executor.organize_by_size(
+                        plan["directory"],
+                        plan["parallel"],
+                        plan["workers"],
+                        progress
+                    )
+                    memory.update_preference("last_directory", plan["directory"])
+                    
+                elif plan["action"] == "organize_by_keys":
+                    result = executor.organize_by_keys(
+                        plan["directory"],
+                        plan["keys"],
+                        plan["use_modified"],
+                        plan["parallel"],
+                        plan["workers"],
+                        progress
                     )
                     memory.update_preference("last_directory", plan["directory"])
                     
@@ -128,43 +156,247 @@ if user_input:
                         plan["directory"],
                         plan["file_name"]
                     )
+                    
+                    # An exact miss is often a typo, so offer the closest names instead
+                    if not result["error"] and not result["found"]:
+                        result["suggestions"] = executor.find_file_fuzzy(
+                            plan["directory"],
+                            plan["file_name"]
+                        )["found"]
+                    memory.update_preference("last_directory", plan["directory"])
+                    
+                elif plan["action"] == "find_file_fuzzy":
+                    result = executor.find_file_fuzzy(
+                        plan["directory"],
+                        plan["file_name"]
+                    )
+                    memory.update_preference("last_directory", plan["directory"])
+                    
+                elif plan["action"] == "find_files":
+                    result = executor.find_files(
+                        plan["directory"],
+                        plan["filters"],
+                        progress
+                    )
                     memory.update_preference("last_directory", plan["directory"])
+                    
+                elif plan["action"] == "find_duplicates":
+                    result = executor.find_duplicates(plan["directory"])
+                    memory.update_preference("last_directory", plan["directory"])
+                    
+                elif plan["action"] == "undo_organize":
+                    result = executor.undo_last_organize(plan["directory"], progress=progress)
                 
-                # Only show raw results in debug mode
-                if debug_mode:
-                    with st.expander("Raw execution results"):
-                        st.json(result)
+                command["result"] = result
+                command["table"] = build_result_table(plan, result)
             
             except Exception as e:
-                st.error(f"Error during execution: {str(e)}")
-                st.stop()
+                command["error"] = f"Error during execution: {str(e)}"
+        
+        if progress_bar is not None:
+            progress_bar.empty()
+        
+        # Start watching the directory if it became the last used one
+        runtime.watcher.sync_workspaces()
+
+def show_progress(progress_bar, progress):
+    """Progress callback: move the bar and describe the files done so far"""
+    progress_bar.progress(progress.fraction or 0.0, text=progress.describe())
+
+def build_result_table(plan, result, move_plan=None):
+    """Compact table of a command's files, built once and kept in session state"""
+    if move_plan is not None:
+        moves = move_plan.moves
+        return ResultTable(["Name", "Destination", "Renamed to"], {
+            "Name": [os.path.basename(source) for source, _, _ in moves],
+            "Destination": [os.path.relpath(os.path.dirname(destination), move_plan.directory) for _, destination, _ in moves],
+            "Renamed to": [
+                os.path.basename(destination) if os.path.basename(source) != os.path.basename(destination) else ""
+                for source, destination, _ in moves
+            ]
+        })
+    
+    if plan["action"] in ORGANIZE_ACTIONS:
+        group, field = ORGANIZE_ACTIONS[plan["action"]]
+        moved = result['moved']
+        return ResultTable(["Name", group, "Moved to"], {
+            "Name": moved.names,
+            group: moved.values(field) if len(moved) else [],
+            "Moved to": moved.target_directories()
+        })
+    
+    if plan["action"] == "undo_organize":
+        restored = result["restored"]
+        return ResultTable(["Name", "Moved back to", "From"], {
+            "Name": restored.names,
+            "Moved back to": restored.target_directories(),
+            "From": restored.source_directories()
+        })
+    
+    if plan["action"] == "find_file_fuzzy":
+        return ResultTable.from_paths(result["found"], **{"Edit distance": result["distances"]})
+    
+    if plan["action"] == "find_duplicates":
+        paths, groups, sizes = [], [], []
+        for number, group in enumerate(result["groups"], 1):
+            paths.extend(group["files"])
+            groups.extend([number] * len(group["files"]))
+            sizes.extend([group["size"]] * len(group["files"]))
+        return ResultTable.from_paths(paths, Group=groups, **{"Size (bytes)": sizes})
+    
+    return ResultTable.from_paths(result.get("found", []))
+
+def render_table(table, key, group_column=None):
+    """One page of a result table with filter, sort and paging controls.
+    
+    Filtering, sorting and slicing happen here on the server; only the
+    visible page is sent to the browser.
+    """
+    col1, col2, col3 = st.columns([3, 2, 1])
+    query = col1.text_input("Filter", key=f"{key}_filter", placeholder="Part of a name or folder")
+    sort_by = col2.selectbox("Sort by", table.columns, key=f"{key}_sort")
+    descending = col3.toggle("Descending", key=f"{key}_descending")
+    
+    where = None
+    if group_column:
+        groups = table.distinct(group_column)
+        group = st.selectbox(
+            group_column, ["All"] + list(groups), key=f"{key}_group",
+            format_func=lambda value: value if value == "All" else f"{value} ({groups[value]} files)"
+        )
+        if group != "All":
+            where = {group_column: group}
+    
+    rows = table.view(query, sort_by, descending, where)
+    pages = max(1, math.ceil(len(rows) / RESULT_PAGE_SIZE))
+    page = 1
+    if pages > 1:
+        # A narrower filter can leave the remembered page past the end
+        if st.session_state.get(f"{key}_page", 1) > pages:
+            st.session_state[f"{key}_page"] = pages
+        page = st.number_input("Page", min_value=1, max_value=pages, key=f"{key}_page")
+    
+    st.dataframe(table.page(rows, page - 1, RESULT_PAGE_SIZE), use_container_width=True, hide_index=True)
+    
+    first = (page - 1) * RESULT_PAGE_SIZE
+    caption = f"Showing {min(first + 1, len(rows))}–{min(first + RESULT_PAGE_SIZE, len(rows))} of {len(rows)}, page {page} of {pages}"
+    if len(rows) != len(table):
+        caption += f" (filtered from {len(table)})"
+    st.caption(caption)
+
+def render_errors(errors):
+    """Show errors if any, at most one page of them"""
+    if errors:
+        with st.expander(f"⚠️ Errors ({len(errors)})"):
+            for err in errors[:RESULT_PAGE_SIZE]:
+                st.error(f"{os.path.basename(err['file'])}: {err['error']}")
+            if len(errors) > RESULT_PAGE_SIZE:
+                st.caption(f"...and {len(errors) - RESULT_PAGE_SIZE} more")
+
+def truncate_lists(data):
+    """data with long lists cut to one page, to keep debug output small"""
+    if isinstance(data, MoveResults):
+        return truncate_lists(data.to_dict())
+    if isinstance(data, dict):
+        return {key: truncate_lists(value) for key, value in data.items()}
+    if isinstance(data, list) and len(data) > RESULT_PAGE_SIZE:
+        return [truncate_lists(item) for item in data[:RESULT_PAGE_SIZE]] + [f"... {len(data) - RESULT_PAGE_SIZE} more"]
+    return data
+
+def render_trace(trace):
+    """Per-phase timings and counters of a command, plus totals since start"""
+    with st.expander(f"Timings ({trace['total_ms']:.0f} ms)"):
+        st.dataframe({
+            "Span": [item["name"] for item in trace["spans"]],
+            "ms": [item["ms"] for item in trace["spans"]]
+        }, use_container_width=True, hide_index=True)
+        if trace["counters"]:
+            st.caption(", ".join(f"{name}: {value}" for name, value in sorted(trace["counters"].items())))
+        
+        summary = runtime.metrics.summary()
+        st.markdown(f"**All commands since start ({summary['traces']})**")
+        st.dataframe({
+            "Span": list(summary["spans"]),
+            "count": [row["count"] for row in summary["spans"].values()],
+            "mean ms": [row["mean_ms"] for row in summary["spans"].values()],
+            "p50 ms": [row["p50_ms"] for row in summary["spans"].values()],
+            "p95 ms": [row["p95_ms"] for row in summary["spans"].values()]
+        }, use_container_width=True, hide_index=True)
+        st.download_button(
+            "Export metrics", json.dumps(summary, indent=2),
+            file_name="file_agent_metrics.json", mime="application/json"
+        )
+
+def render_command(command, debug_mode):
+    """Show the outcome of a command; cheap enough to repeat on every rerun"""
+    parsed_request = command["parsed_request"]
+    plan = command["plan"]
+    
+    # Only show the technical details if debug mode is on
+    if debug_mode:
+        col1, col2 = st.columns(2)
+        with col1:
+            st.subheader("Understanding")
+            st.json(parsed_request)
+        with col2:
+            st.subheader("Planning")
+            st.json(plan)
+        
+        cache_stats = understanding.get_cache_stats()
+        st.caption(
+            f"Parse cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+            f"({cache_stats['hit_rate']:.0%} of LLM round trips avoided)"
+        )
+        with st.expander("Parser latency and agreement"):
+            st.json(understanding.get_parse_stats())
+        
+        render_trace(command["trace"])
+    
+    if command["error"]:
+        st.error(command["error"])
+        return
+    
+    if command["move_plan"] is not None:
+        move_plan = command["move_plan"]
+        st.info(f"🔍 Preview: {len(move_plan)} files in {plan['directory']} would be moved. Nothing has been changed.")
+        
+        if debug_mode:
+            with st.expander("Raw move plan"):
+                st.json(truncate_lists(move_plan.to_dict()))
+        
+        # Show planned moves, one page at a time
+        if len(move_plan):
+            render_table(command["table"], f"table_{command['id']}", group_column="Destination")
+        
+        render_errors(move_plan.errors)
+    
+    elif plan["action"] != "unknown":
+        result = command["result"]
+        table = command["table"]
+        table_key = f"table_{command['id']}"
+        
+        # Only show raw results in debug mode
+        if debug_mode:
+            with st.expander("Raw execution results"):
+                st.json(truncate_lists(result))
+        
+        if plan["action"] in ORGANIZE_ACTIONS and result["resumed"]:
+            resumed = result["resumed"]
+            st.info(f"↩️ Finished an interrupted run first; {resumed['left']} of its {resumed['planned']} moves were left.")
         
         # Display results in a user-friendly format
-        if plan["action"] == "organize_by_type":
+        if plan["action"] in ORGANIZE_ACTIONS and not result['moved'] and not result['errors']:
+            st.info(f"✅ Nothing new to organize in {plan['directory']}.")
+        
+        elif plan["action"] == "organize_by_type":
             st.success(f"✅ Organized {len(result['moved'])} files in {plan['directory']} by type.")
             
             # Show moved files in an expander
             if result['moved']:
                 with st.expander("See organized files"):
-                    # Group by type for better visualization
-                    by_type = {}
-                    for item in result['moved']:
-                        file_type = item['type']
-                        if file_type not in by_type:
-                            by_type[file_type] = []
-                        by_type[file_type].append(os.path.basename(item['from']))
-                    
-                    # Display by type
-                    for file_type, files in sorted(by_type.items()):
-                        st.subheader(f"{file_type}")
-                        file_list = [f"- {file}" for file in sorted(files)]
-                        st.text("\n".join(file_list))
+                    render_table(table, table_key, group_column="Type")
             
-            # Show errors if any
-            if result['errors']:
-                with st.expander(f"⚠️ Errors ({len(result['errors'])})"):
-                    for err in result['errors']:
-                        st.error(f"{os.path.basename(err['file'])}: {err['error']}")
+            render_errors(result['errors'])
         
         elif plan["action"] == "organize_by_date":
             st.success(f"✅ Organized {len(result['moved'])} files in {plan['directory']} by date.")
@@ -172,25 +404,20 @@ if user_input:
             # Show moved files in an expander
             if result['moved']:
                 with st.expander("See organized files"):
-                    # Group by date category for better visualization
-                    by_date = {}
-                    for item in result['moved']:
-                        date_cat = item['date_category']
-                        if date_cat not in by_date:
-                            by_date[date_cat] = []
-                        by_date[date_cat].append(os.path.basename(item['from']))
-                    
-                    # Display by date category
-                    for date_cat, files in sorted(by_date.items()):
-                        st.subheader(f"{date_cat}")
-                        file_list = [f"- {file}" for file in sorted(files)]
-                        st.text("\n".join(file_list))
+                    render_table(table, table_key, group_column="Date")
+            
+            render_errors(result['errors'])
+        
+        elif plan["action"] in ["organize_by_size", "organize_by_keys"]:
+            keys = plan.get("keys", ["size"])
+            st.success(f"✅ Organized {len(result['moved'])} files in {plan['directory']} by {', then '.join(keys)}.")
+            
+            # Show moved files in an expander
+            if result['moved']:
+                with st.expander("See organized files"):
+                    render_table(table, table_key, group_column=ORGANIZE_ACTIONS[plan["action"]][0])
             
-            # Show errors if any
-            if result['errors']:
-                with st.expander(f"⚠️ Errors ({len(result['errors'])})"):
-                    for err in result['errors']:
-                        st.error(f"{os.path.basename(err['file'])}: {err['error']}")
+            render_errors(result['errors'])
         
         elif plan["action"] == "find_files_by_type":
             if result["error"]:
@@ -199,49 +426,147 @@ if user_input:
                 st.info(f"⚠️ No {plan['file_type']} files found in {plan['directory']}.")
             else:
                 st.success(f"✅ Found {len(result['found'])} {plan['file_type']} files in {plan['directory']}.")
-                
-                # Display files in a clean format
-                file_container = st.container()
-                with file_container:
-                    # Sort files alphabetically
-                    sorted_files = sorted(result["found"], key=lambda x: os.path.basename(x).lower())
-                    
-                    # Display files with optional grouping
-                    if len(sorted_files) > 10:
-                        with st.expander("View all files"):
-                            for file in sorted_files:
-                                st.text(f"📄 {os.path.basename(file)}")
-                    else:
-                        for file in sorted_files:
-                            st.text(f"📄 {os.path.basename(file)}")
+                render_table(table, table_key)
         
         elif plan["action"] == "find_file_by_name":
             if result["error"]:
                 st.error(f"Error while searching: {result['error']}")
             elif len(result["found"]) == 0:
                 st.info(f"⚠️ No files matching '{plan['file_name']}' found in {plan['directory']}.")
+                if result.get("suggestions"):
+                    st.markdown("**Did you mean:**")
+                    for file in result["suggestions"]:
+                        st.text(f"📄 {os.path.basename(file)} (in {os.path.dirname(file)})")
             else:
                 st.success(f"✅ Found {len(result['found'])} files matching '{plan['file_name']}'.")
+                render_table(table, table_key)
+        
+        elif plan["action"] == "find_file_fuzzy":
+            if result["error"]:
+                st.error(f"Error while searching: {result['error']}")
+            elif len(result["found"]) == 0:
+                st.info(f"⚠️ No files with names close to '{plan['file_name']}' found in {plan['directory']}.")
+            else:
+                st.success(f"✅ Closest matches for '{plan['file_name']}':")
                 
-                # Display files in a clean format
-                file_container = st.container()
-                with file_container:
-                    # Sort files alphabetically
-                    sorted_files = sorted(result["found"], key=lambda x: os.path.basename(x).lower())
-                    
-                    # Display files with optional grouping
-                    if len(sorted_files) > 10:
-                        with st.expander("View all files"):
-                            for file in sorted_files:
-                                st.text(f"📄 {os.path.basename(file)} (in {os.path.dirname(file)})")
-                    else:
-                        for file in sorted_files:
-                            st.text(f"📄 {os.path.basename(file)}")
-                            if debug_mode:
-                                st.text(f"   Location: {os.path.dirname(file)}")
+                # Sorted by edit distance first, so the best match leads
+                render_table(table, table_key)
+        
+        elif plan["action"] == "find_files":
+            if result["error"]:
+                st.error(f"Error while searching: {result['error']}")
+            elif len(result["found"]) == 0:
+                st.info(f"⚠️ No {result['description']} found in {plan['directory']}.")
+            else:
+                st.success(f"✅ Found {len(result['found'])} {result['description']} in {plan['directory']}.")
+                if result["truncated"]:
+                    st.caption("Stopped at the result limit; there may be more matches.")
+                render_table(table, table_key)
+        
+        elif plan["action"] == "find_duplicates":
+            if result["error"]:
+                st.error(f"Error while searching: {result['error']}")
+            elif len(result["groups"]) == 0:
+                st.info(f"⚠️ No duplicate files found in {plan['directory']}.")
+            else:
+                st.success(
+                    f"✅ Found {len(result['groups'])} groups of duplicate files in {plan['directory']}; "
+                    f"{format_size(result['wasted_bytes'])} could be freed."
+                )
+                
+                # Largest groups first; pick one group to see its copies side by side
+                render_table(table, table_key, group_column="Group")
+            
+            render_errors(result["errors"])
+        
+        elif plan["action"] == "undo_organize":
+            if result["error"]:
+                st.info(f"⚠️ {result['error']}.")
+            else:
+                st.success(f"✅ Moved {len(result['restored'])} files in {result['directory']} back where they were.")
+                if result["restored"]:
+                    with st.expander("See restored files"):
+                        render_table(table, table_key)
+            
+            render_errors(result["errors"])
     else:
         st.warning("I don't understand what you want me to do. Please try rephrasing your request.")
 
+# App title and description
+st.title("📁 File Organization Agent")
+st.markdown("""
+This tool helps you organize and find files using simple natural language commands.
+Simply tell the agent what you want to do, and it will handle the rest.
+""")
+
+# Sidebar for agent memory and settings
+with st.sidebar:
+    st.header("Agent Memory")
+    
+    # Show recent actions
+    recent_actions = memory.get_recent_actions(5)
+    if recent_actions:
+        st.subheader("Recent Actions")
+        for action in recent_actions:
+            with st.expander(f"{action['type']} - {action['timestamp'][:16]}"):
+                st.json(action['details'])
+    else:
+        st.info("No actions recorded yet.")
+    
+    # Settings
+    st.subheader("Settings")
+    
+    # Display current workspace
+    current_workspace = memory.get_preference("last_directory", DEFAULT_WORKSPACE)
+    st.text_input("Current Workspace", current_workspace, disabled=True)
+    
+    # Option to change workspace
+    new_workspace = st.text_input("Change Workspace (leave empty to keep current)")
+    # The field keeps its value across reruns, so only act on an actual change
+    if new_workspace and new_workspace != current_workspace:
+        if os.path.exists(new_workspace):
+            memory.update_preference("last_directory", new_workspace)
+            runtime.watcher.sync_workspaces()
+            st.success(f"Workspace updated to: {new_workspace}")
+            st.rerun()
+        else:
+            st.error("Directory does not exist.")
+    
+    # Dry run toggle
+    dry_run = st.toggle("Preview only (dry run)", value=False,
+                        help="Show where files would go without moving anything")
+    
+    # Debug mode toggle
+    debug_mode = st.toggle("Developer Mode", value=False, 
+                          help="Show technical details like parsing and planning")
+    
+    # Rebuild the components, e.g. after editing config.py or the API key
+    if st.button("Restart agent", help="Save memory, stop the file watcher and start fresh"):
+        runtime.close()
+        get_runtime.clear()
+        st.session_state.pop("last_command", None)
+        st.rerun()
+
+# Main interaction area
+st.header("What would you like me to do?")
+
+# Input box for user command
+user_input = st.text_input("Enter your request", 
+                          placeholder="E.g., 'organize my downloads by file type' or 'find PDFs in documents'")
+
+last_command = st.session_state.get("last_command")
+
+# Only a new request runs; other reruns redraw the last result from session state
+if user_input:
+    is_new = (
+        last_command is None
+        or last_command["input"] != user_input
+        or last_command["dry_run"] != dry_run
+    )
+    if st.button("Run again") or is_new:
+        run_command(user_input, dry_run)
+    render_command(st.session_state["last_command"], debug_mode)
+
 # Add some example commands for first-time users
 if not memory.get_recent_actions(1):
     st.divider()
@@ -250,7 +575,12 @@ if not memory.get_recent_actions(1):
     - "Organize my downloads folder by file type"
     - "Find all PDF files in my documents folder"
     - "Sort my desktop by date modified"
+    - "Organize my downloads by type and date"
     - "Find files named 'report' in my downloads"
+    - "Find files similar to 'reprot' in my downloads"
+    - "Find PDFs larger than 10MB modified in the last 30 days in my downloads"
+    - "Find duplicate files in my downloads"
+    - "Undo the last organize"
     """)
 
 # Footer
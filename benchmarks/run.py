@@ -0,0 +1,260 @@
+"""Benchmark the executor on synthetic directory trees.
+
+    python -m benchmarks.run --scales 1000,10000 --output results.json
+    python -m benchmarks.run --scales 1000,10000 --compare results.json
+
+Every benchmark gets a freshly generated tree (on /dev/shm when available),
+its own memory files and its own index, so runs are reproducible and never
+touch the user's workspace or memory.
+"""
+import argparse
+import functools
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from agent.memory import Memory
+from agent.execution import Executor
+from agent.index import FileIndex
+from benchmarks.tree import generate_tree, parse_extensions, default_base_dir
+
+# File system calls counted during each benchmark. Calls made from C, such as
+# DirEntry.stat() or SQLite's own I/O, are not visible at this level.
+COUNTED_CALLS = {
+    os: ["stat", "lstat", "scandir", "listdir", "rename", "replace", "link", "mkdir",
+         "makedirs", "utime", "unlink", "remove", "open"],
+    shutil: ["move", "copy2", "copystat"],
+}
+
+class SyscallCounter:
+    """Count calls to the os and shutil file system functions while active"""
+
+    def __init__(self):
+        self.counts = {}
+        self.originals = []
+        # Parallel moves call into the wrappers from several threads
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        for module, names in COUNTED_CALLS.items():
+            for name in names:
+                original = getattr(module, name)
+                label = f"{module.__name__}.{name}"
+                setattr(module, name, self._counting(original, label))
+                self.originals.append((module, name, original))
+        return self
+
+    def __exit__(self, *exc_info):
+        for module, name, original in reversed(self.originals):
+            setattr(module, name, original)
+        self.originals = []
+
+    def _counting(self, function, label):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with self.lock:
+                self.counts[label] = self.counts.get(label, 0) + 1
+            return function(*args, **kwargs)
+        return wrapper
+
+    def total(self):
+        return sum(self.counts.values())
+
+class Workspace:
+    """A generated tree plus private memory, index and move journal files, removed on exit"""
+
+    def __init__(self, base_dir, tree_options):
+        self.base_dir = base_dir
+        self.tree_options = tree_options
+
+    def __enter__(self):
+        self.path = tempfile.mkdtemp(prefix="file_agent_bench_", dir=self.base_dir)
+        self.root = os.path.join(self.path, "tree")
+        self.tree = generate_tree(self.root, **self.tree_options)
+        self.memory = Memory(
+            memory_file=os.path.join(self.path, "memory.json"),
+            journal_file=os.path.join(self.path, "memory.journal")
+        )
+        self.index = FileIndex(os.path.join(self.path, "index.db"))
+        self.executor = Executor(self.memory, self.index, os.path.join(self.path, "moves"))
+        return self
+
+    def __exit__(self, *exc_info):
+        self.index.close()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+def _organize_by_type(workspace, parallel):
+    result = workspace.executor.organize_by_type(workspace.root, parallel=parallel)
+    return len(result["moved"])
+
+def _organize_by_date(workspace, parallel):
+    result = workspace.executor.organize_by_date(workspace.root, parallel=parallel)
+    return len(result["moved"])
+
+def _organize_by_keys(workspace, keys):
+    result = workspace.executor.organize_by_keys(workspace.root, keys)
+    return len(result["moved"])
+
+def _tree_files(workspace):
+    """Files a recursive search looks at, including the planted name collisions"""
+    return workspace.tree["files"] + workspace.tree["collisions"]
+
+def _find_files_by_type(workspace, file_type):
+    workspace.executor.find_files_by_type(workspace.root, file_type)
+    # Only the files directly inside the root are searched
+    return workspace.tree["root_files"]
+
+def _find_file_by_name(workspace, file_name):
+    workspace.executor.find_file_by_name(workspace.root, file_name)
+    return _tree_files(workspace)
+
+def _find_files(workspace, filters):
+    workspace.executor.find_files(workspace.root, filters)
+    return _tree_files(workspace)
+
+# name -> (function, argument, whether an untimed call runs first to warm the index)
+BENCHMARKS = {
+    "organize_by_type": (_organize_by_type, False, False),
+    "organize_by_type_parallel": (_organize_by_type, True, False),
+    "organize_by_date": (_organize_by_date, False, False),
+    "organize_by_type_date": (_organize_by_keys, ["type", "date"], False),
+    "find_files_by_type_cold": (_find_files_by_type, "pdf", False),
+    "find_files_by_type_warm": (_find_files_by_type, "pdf", True),
+    "find_file_by_name_cold": (_find_file_by_name, "report", False),
+    "find_file_by_name_warm": (_find_file_by_name, "report", True),
+    "find_files_filtered": (_find_files, {"extensions": ["pdf"], "min_size": "1kb"}, False),
+}
+
+def run_benchmark(name, files, base_dir, tree_options, repeat):
+    """Best of repeat runs of one benchmark, each on a fresh tree"""
+    function, argument, warm_up = BENCHMARKS[name]
+    best = None
+    for _ in range(repeat):
+        with Workspace(base_dir, dict(tree_options, files=files)) as workspace:
+            if warm_up:
+                function(workspace, argument)
+            with SyscallCounter() as counter:
+                started = time.perf_counter()
+                processed = function(workspace, argument)
+                seconds = time.perf_counter() - started
+            if best is None or seconds < best["seconds"]:
+                best = {
+                    "benchmark": name,
+                    "files": files,
+                    "processed": processed,
+                    "seconds": seconds,
+                    "files_per_sec": processed / seconds if seconds else None,
+                    "syscalls": counter.total(),
+                    "syscalls_by_call": dict(sorted(counter.counts.items())),
+                    "tree": workspace.tree,
+                }
+    return best
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline, threshold):
+    """Print the change against a baseline; returns the regressions beyond threshold"""
+    previous = {(row["benchmark"], row["files"]): row for row in baseline["results"]}
+    regressions = []
+    print(f"\n{'benchmark':<28}{'files':>9}{'before s':>11}{'after s':>11}{'change':>9}{'syscalls':>16}")
+    for row in results:
+        old = previous.get((row["benchmark"], row["files"]))
+        if old is None:
+            continue
+        change = row["seconds"] / old["seconds"] - 1 if old["seconds"] else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(row)
+        print(f"{row['benchmark']:<28}{row['files']:>9}{old['seconds']:>11.4f}{row['seconds']:>11.4f}"
+              f"{change:>+9.1%}{old['syscalls']:>8}->{row['syscalls']:<7}{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the File Organization Agent executor")
+    parser.add_argument("--scales", default="1000,10000",
+                        help="comma separated file counts (default: 1000,10000)")
+    parser.add_argument("--benchmarks", default=",".join(BENCHMARKS),
+                        help="comma separated benchmarks to run (default: all)")
+    parser.add_argument("--depth", type=int, default=3, help="nested directory levels")
+    parser.add_argument("--fanout", type=int, default=4, help="subdirectories per directory")
+    parser.add_argument("--extensions", type=parse_extensions, default=None,
+                        help='extension weights, e.g. "pdf=20,jpg=10,none=5"')
+    parser.add_argument("--root-share", type=float, default=0.5,
+                        help="share of files directly in the organized folder")
+    parser.add_argument("--collision-rate", type=float, default=0.05,
+                        help="share of root files whose name already exists at the destination")
+    parser.add_argument("--date-spread", type=int, default=730,
+                        help="modification times spread over this many days")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark; the best is kept")
+    parser.add_argument("--base-dir", default=default_base_dir(),
+                        help="where trees are generated (default: /dev/shm if available)")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="slowdown reported as a regression (default: 0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    tree_options = {
+        "depth": args.depth,
+        "fanout": args.fanout,
+        "extensions": args.extensions,
+        "root_share": args.root_share,
+        "collision_rate": args.collision_rate,
+        "date_spread_days": args.date_spread,
+        "seed": args.seed,
+    }
+    names = [name.strip() for name in args.benchmarks.split(",") if name.strip()]
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    results = []
+    print(f"{'benchmark':<28}{'files':>9}{'seconds':>11}{'files/s':>12}{'syscalls':>10}")
+    for files in (int(scale) for scale in args.scales.split(",")):
+        for name in names:
+            row = run_benchmark(name, files, args.base_dir, tree_options, args.repeat)
+            results.append(row)
+            print(f"{name:<28}{files:>9}{row['seconds']:>11.4f}{row['files_per_sec'] or 0:>12.0f}{row['syscalls']:>10}")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "base_dir": args.base_dir or tempfile.gettempdir(),
+            "repeat": args.repeat,
+            "tree_options": tree_options,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
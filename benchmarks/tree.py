@@ -0,0 +1,95 @@
+import os
+import random
+import time
+from agent.utils.file_helpers import get_file_type
+
+# Extension -> relative weight, roughly what a downloads folder looks like
+DEFAULT_EXTENSIONS = {
+    "pdf": 20, "jpg": 18, "png": 12, "docx": 8, "xlsx": 5, "txt": 8, "zip": 6,
+    "mp4": 3, "mp3": 3, "csv": 4, "py": 4, "json": 4, "": 5,
+}
+
+WORDS = [
+    "report", "invoice", "photo", "scan", "notes", "draft", "final", "budget",
+    "summary", "meeting", "project", "backup", "export", "screenshot", "resume",
+]
+
+def parse_extensions(spec):
+    """Extension mix from "pdf=20,jpg=10,none=5" (none means no extension)"""
+    extensions = {}
+    for item in spec.split(","):
+        extension, _, weight = item.partition("=")
+        extension = extension.strip().lstrip(".")
+        extensions["" if extension == "none" else extension] = float(weight or 1)
+    return extensions
+
+def default_base_dir():
+    """A RAM-backed directory where available, so the disk does not skew timings"""
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+        return "/dev/shm"
+    return None
+
+def generate_tree(root, files, depth=3, fanout=4, extensions=None, root_share=0.5,
+                  collision_rate=0.05, date_spread_days=730, seed=0):
+    """Create a synthetic tree of empty files under root and describe it.
+
+    root_share of the files sit directly in root (what organize operates on),
+    the rest are spread over a tree of the given depth and fanout. A
+    collision_rate share of root files already have a same-named file in the
+    folder organize_by_type will move them to, and modification times are
+    spread uniformly over the last date_spread_days days. The same seed
+    always produces the same tree.
+    """
+    rng = random.Random(seed)
+    extensions = extensions or DEFAULT_EXTENSIONS
+    names = list(extensions)
+    weights = [extensions[name] for name in names]
+    now = time.time()
+
+    directories = [root]
+    level = [root]
+    for current_depth in range(depth):
+        next_level = []
+        for parent in level:
+            for child in range(fanout):
+                path = os.path.join(parent, f"dir_{current_depth}_{child}")
+                next_level.append(path)
+        directories.extend(next_level)
+        level = next_level
+    for directory in directories:
+        os.makedirs(directory, exist_ok=True)
+
+    nested = directories[1:] or [root]
+    root_files = int(files * root_share) if len(directories) > 1 else files
+    collisions = 0
+    extension_counts = {}
+
+    for number in range(files):
+        extension = rng.choices(names, weights)[0]
+        stem = f"{rng.choice(WORDS)}_{number}"
+        name = f"{stem}.{extension}" if extension else stem
+        directory = root if number < root_files else rng.choice(nested)
+        path = os.path.join(directory, name)
+
+        open(path, "w").close()
+        mtime = now - rng.uniform(0, date_spread_days * 24 * 60 * 60)
+        os.utime(path, (mtime, mtime))
+        extension_counts[extension or "none"] = extension_counts.get(extension or "none", 0) + 1
+
+        if directory == root and rng.random() < collision_rate:
+            target_dir = os.path.join(root, get_file_type(name))
+            os.makedirs(target_dir, exist_ok=True)
+            open(os.path.join(target_dir, name), "w").close()
+            collisions += 1
+
+    return {
+        "files": files,
+        "root_files": root_files,
+        "directories": len(directories),
+        "depth": depth,
+        "fanout": fanout,
+        "collisions": collisions,
+        "date_spread_days": date_spread_days,
+        "extensions": extension_counts,
+        "seed": seed,
+    }
@@ -15,4 +15,90 @@ DEFAULT_WORKSPACE = os.path.join(Path.home(), "Documents", "agent_workspace")
 os.makedirs(DEFAULT_WORKSPACE, exist_ok=True)
 
 # Memory file path
-MEMORY_FILE = os.path.join(Path.home(), ".file_agent_memory.json")
\ No newline at end of file
+MEMORY_FILE = os.path.join(Path.home(), ".file_agent_memory.json")
+
+# Append-only journal of memory changes since the last snapshot
+MEMORY_JOURNAL_FILE = os.path.join(Path.home(), ".file_agent_memory.journal")
+
+# Journal entries written before the snapshot is rewritten and the journal truncated
+MEMORY_COMPACT_EVERY = 500
+
+# Number of actions kept in the snapshot (None keeps everything)
+MEMORY_MAX_ACTIONS = 5000
+
+# Persistent file metadata index
+INDEX_FILE = os.path.join(Path.home(), ".file_agent_index.db")
+
+# Workspace watcher: seconds of quiet before a batch of events is committed,
+# and the batch size that forces a commit during sustained activity
+WATCH_DEBOUNCE_SECONDS = 1.0
+WATCH_MAX_BATCH = 1000
+
+# Longest an event waits for a commit under steady activity, in debounce intervals
+WATCH_MAX_DELAY_INTERVALS = 3
+
+# Organize runs: move files with a thread pool by default, and its size
+PARALLEL_MOVES = True
+MOVE_WORKERS = 8
+
+# Threads copying files when a move crosses to another file system
+COPY_WORKERS = 4
+
+# Organize runs are journaled here before any file moves, for resume and undo.
+# Finished moves are checkpointed in batches; the newest journals are kept
+MOVE_JOURNAL_DIR = os.path.join(os.path.dirname(MEMORY_FILE), ".file_agent_moves")
+MOVE_JOURNAL_CHECKPOINT = 500
+MOVE_JOURNAL_KEEP = 20
+
+# Threads listing directories during recursive searches and index refreshes;
+# they overlap round trips on network file systems. 1 walks on the caller
+WALK_WORKERS = 8
+
+# Keys a composite organize can nest folders by
+ORGANIZE_KEYS = ("type", "date", "size")
+
+# Fuzzy name search: largest edit distance accepted, results returned,
+# and trigram candidates verified per query
+FUZZY_MAX_DISTANCE = 2
+FUZZY_TOP_K = 10
+FUZZY_CANDIDATES = 5000
+
+# Gemini model used to parse requests
+GEMINI_MODEL = "gemini-2.0-flash"
+
+# Gemini requests: seconds before a request is abandoned, extra attempts for
+# transient failures, and the initial backoff (doubled after every attempt)
+LLM_TIMEOUT = 10.0
+LLM_RETRIES = 2
+LLM_BACKOFF = 0.5
+
+# Requests the local parser understands with at least this confidence skip the LLM
+LOCAL_PARSE_CONFIDENCE = 0.8
+
+# Share of confident local parses that are also sent to the LLM in the
+# background, to measure how often the two agree
+SPECULATIVE_AUDIT_RATE = 0.05
+
+# Cache of LLM parse results: a persistent tier next to the memory file and a
+# smaller in-memory LRU tier in front of it
+PARSE_CACHE_FILE = os.path.join(os.path.dirname(MEMORY_FILE), ".file_agent_parse_cache.json")
+PARSE_CACHE_SIZE = 2000
+PARSE_CACHE_MEMORY_SIZE = 256
+PARSE_CACHE_TTL = 7 * 24 * 60 * 60  # seconds
+
+# Per-command latency spans and counters, one JSON line per command. Only the
+# newest traces are kept; the file is trimmed once it holds twice as many
+METRICS_FILE = os.path.join(os.path.dirname(MEMORY_FILE), ".file_agent_metrics.jsonl")
+METRICS_KEEP = 10000
+
+# Rows per page in the web interface's result tables
+RESULT_PAGE_SIZE = 100
+
+# Seconds between progress reports while files are moved or found
+PROGRESS_INTERVAL = 0.1
+
+# Duplicate detection: bytes read from each end of a file before a full hash,
+# hashing threads, and the smallest file size considered
+DUPLICATE_BLOCK_SIZE = 64 * 1024
+DUPLICATE_WORKERS = 8
+DUPLICATE_MIN_SIZE = 1
@@ -1,10 +1,22 @@
 import os
-from agent.memory import Memory
-from agent.understanding import Understanding
-from agent.planning import Planner
-from agent.execution import Executor
+from agent.runtime import AgentRuntime
+from agent.instrumentation import span
+from agent.progress import Progress
+from agent.query import FileQuery
+from agent.utils.file_helpers import format_size
 from config import DEFAULT_WORKSPACE
 
+# Organize actions, and how their summary names what files were grouped by
+ORGANIZED_BY = {
+    "organize_by_type": lambda plan: "type",
+    "organize_by_date": lambda plan: "date",
+    "organize_by_size": lambda plan: "size",
+    "organize_by_keys": lambda plan: ", then ".join(plan["keys"]),
+}
+
+# Actions run through Executor.stream, printing files as they are done
+STREAMED_ACTIONS = set(ORGANIZED_BY) | {"find_files_by_type", "find_file_by_name", "find_files"}
+
 def print_welcome():
     print("=" * 60)
     print("  File Organization Agent - Your Personal File Assistant")
@@ -12,48 +24,139 @@ def print_welcome():
     print("You can ask me to:")
     print("  - Organize files by type: 'organize my downloads by file type'")
     print("  - Organize files by date: 'sort my desktop by date modified'")
+    print("  - Organize by several keys at once: 'organize my downloads by type and date'")
     print("  - Find files: 'find all PDFs in my documents folder'")
+    print("  - Filter files: 'find pdfs larger than 10MB modified in the last 30 days in downloads'")
+    print("  - Find similar names: 'find files similar to reprot in downloads'")
+    print("  - Find duplicates: 'find duplicate files in my downloads'")
+    print("  - Undo: 'undo the last organize'")
     print("\nType 'exit' to quit.")
     print("=" * 60)
 
+def print_progress(progress):
+    """Rewrite one status line while files are being moved"""
+    print(f"\r  {progress.describe()}\033[K", end="\n" if progress.finished else "", flush=True)
+
+def stream_plan(executor, plan):
+    """Run a plan through Executor.stream, printing as files are found; returns the closing message"""
+    action = plan["action"]
+    organizing = action in ORGANIZED_BY
+    progress = Progress(print_progress if organizing else None)
+    events = executor.stream(plan, progress)
+    moved = found = failed = 0
+    folders = set()
+    errors = []
+    
+    try:
+        for kind, item in events:
+            if kind == "moved":
+                moved += 1
+                folders.add(os.path.relpath(os.path.dirname(item["to"]), plan["directory"]))
+            elif kind == "found":
+                found += 1
+                print(f"  - {os.path.basename(item)} (in {os.path.dirname(item)})")
+            elif kind == "resumed":
+                print(f"Resuming an interrupted run: {item['left']} of {item['planned']} moves were left.")
+            else:
+                # Only the first few are shown
+                failed += 1
+                if len(errors) < 5:
+                    errors.append(item)
+    except KeyboardInterrupt:
+        progress.cancel()
+        events.close()
+        done = moved if organizing else found
+        return f"\nStopped after {done} files."
+    except Exception as e:
+        if organizing:
+            raise
+        return f"Error while searching: {str(e)}"
+    
+    if organizing:
+        if moved == 0 and failed == 0:
+            return f"Nothing new to organize in {plan['directory']}."
+        message = (f"I organized {moved} files in {plan['directory']} by {ORGANIZED_BY[action](plan)}.\n"
+                   f"Created folders: {', '.join(sorted(folders))}")
+        if failed:
+            message += f"\n{failed} files could not be moved, e.g.:\n" + "\n".join(
+                f"  - {error['file']}: {error['error']}" for error in errors
+            )
+        return message
+    
+    if action == "find_files_by_type":
+        if found == 0:
+            return f"I couldn't find any {plan['file_type']} files in {plan['directory']}."
+        return f"I found {found} {plan['file_type']} files in {plan['directory']}."
+    
+    if action == "find_file_by_name":
+        if found == 0:
+            message = f"I couldn't find any files matching '{plan['file_name']}' in {plan['directory']}."
+            # An exact miss is often a typo, so offer the closest names instead
+            suggestions = executor.find_file_fuzzy(plan["directory"], plan["file_name"])["found"]
+            if suggestions:
+                files_list = "\n  - ".join([f"{os.path.basename(f)} (in {os.path.dirname(f)})" for f in suggestions])
+                message += f"\nDid you mean:\n  - {files_list}"
+            return message
+        return f"I found {found} files matching '{plan['file_name']}'."
+    
+    query = FileQuery.from_filters(plan["filters"])
+    if found == 0:
+        return f"I couldn't find any {query.describe()} in {plan['directory']}."
+    message = f"I found {found} {query.describe()}."
+    if query.limit is not None and found >= query.limit:
+        message += "\n(Stopped at the result limit; there may be more.)"
+    return message
+
 def format_response(result, plan):
     """Format execution results into user-friendly message"""
-    if plan["action"] == "organize_by_type":
-        return (f"I organized {len(result['moved'])} files in {plan['directory']} by type.\n"
-                f"Created folders: {', '.join(set([item['type'] for item in result['moved']]))}")
-                
-    elif plan["action"] == "organize_by_date":
-        return (f"I organized {len(result['moved'])} files in {plan['directory']} by date.\n"
-                f"Created date categories: {', '.join(set([item['date_category'] for item in result['moved']]))}")
-                
-    elif plan["action"] == "find_files_by_type":
+    if plan["action"] == "find_file_fuzzy":
         if result["error"]:
             return f"Error while searching: {result['error']}"
         elif len(result["found"]) == 0:
-            return f"I couldn't find any {plan['file_type']} files in {plan['directory']}."
+            return f"I couldn't find any files with names close to '{plan['file_name']}' in {plan['directory']}."
         else:
-            files_list = "\n  - ".join([os.path.basename(f) for f in result["found"]])
-            return f"I found {len(result['found'])} {plan['file_type']} files in {plan['directory']}:\n  - {files_list}"
+            files_list = "\n  - ".join([f"{os.path.basename(f)} (in {os.path.dirname(f)})" for f in result["found"]])
+            return f"Closest matches for '{plan['file_name']}':\n  - {files_list}"
+
+    elif plan["action"] == "undo_organize":
+        if result["error"]:
+            return f"{result['error']}."
+        message = f"I moved {len(result['restored'])} files in {result['directory']} back where they were."
+        if result["errors"]:
+            message += f"\n{len(result['errors'])} files could not be moved back, e.g.:\n" + "\n".join(
+                f"  - {error['file']}: {error['error']}" for error in result["errors"][:5]
+            )
+        return message
 
-    elif plan["action"] == "find_file_by_name":
+    elif plan["action"] == "find_duplicates":
         if result["error"]:
             return f"Error while searching: {result['error']}"
-        elif len(result["found"]) == 0:
-            return f"I couldn't find any files matching '{plan['file_name']}' in {plan['directory']}."
+        elif len(result["groups"]) == 0:
+            return f"I couldn't find any duplicate files in {plan['directory']}."
         else:
-            files_list = "\n  - ".join([f"{os.path.basename(f)} (in {os.path.dirname(f)})" for f in result["found"]])
-            return f"I found {len(result['found'])} files matching '{plan['file_name']}':\n  - {files_list}"
+            groups_list = "\n".join(
+                f"  {format_size(group['size'])} x {len(group['files'])}:\n" +
+                "\n".join(f"    - {f}" for f in group["files"])
+                for group in result["groups"]
+            )
+            return (f"I found {len(result['groups'])} groups of duplicate files in {plan['directory']} "
+                    f"({format_size(result['wasted_bytes'])} could be freed):\n{groups_list}")
 
 # Update the main function in main.py to remove the confirmation step
 
 def main():
-    memory = Memory()
-    understanding = Understanding(memory)
-    planner = Planner(memory)
-    executor = Executor(memory)
+    runtime = AgentRuntime().start()
     
     print_welcome()
     
+    try:
+        run_loop(runtime.understanding, runtime.planner, runtime.executor,
+                 runtime.memory, runtime.watcher, runtime.metrics)
+    finally:
+        runtime.close()
+
+def run_loop(understanding, planner, executor, memory, watcher, metrics):
+    """Read commands and execute them until the user exits"""
     while True:
         try:
             user_input = input("\nWhat would you like me to do? > ")
@@ -62,47 +165,52 @@ def main():
                 print("Thank you for using File Organization Agent! Goodbye.")
                 break
                 
-            # Parse user request
-            parsed_request = understanding.parse_request(user_input)
-            
-            # Create plan
-            plan = planner.create_plan(parsed_request)
-            
-            if plan["action"] == "unknown":
-                print(plan["description"])
-                continue
+            # Time every phase of the command for the metrics file
+            with metrics.trace("command", input=user_input):
+                # Parse user request, warming up the likely target while the LLM works
+                with span("understand"):
+                    pending = understanding.start_parse(user_input)
+                    if not pending.done():
+                        executor.prewarm(planner.resolve_directory(understanding.likely_directory(user_input)))
+                    parsed_request = pending.result()
                 
-            # Execute plan immediately without confirmation
-            print(f"Executing: {plan['description']}...")
-            
-            if plan["action"] == "organize_by_type":
-                result = executor.organize_by_type(plan["directory"])
-                memory.update_preference("last_directory", plan["directory"])
+                # Create plan
+                plan = planner.create_plan(parsed_request)
                 
-            elif plan["action"] == "organize_by_date":
-                result = executor.organize_by_date(
-                    plan["directory"],
-                    plan["use_modified"]
-                )
-                memory.update_preference("last_directory", plan["directory"])
+                if plan["action"] == "unknown":
+                    print(plan["description"])
+                    continue
                 
-            elif plan["action"] == "find_files_by_type":
-                result = executor.find_files_by_type(
-                    plan["directory"],
-                    plan["file_type"]
-                )
-                memory.update_preference("last_directory", plan["directory"])
+                # Execute plan immediately without confirmation
+                print(f"Executing: {plan['description']}...")
                 
-            elif plan["action"] == "find_file_by_name":
-                result = executor.find_file_by_name(
-                    plan["directory"],
-                    plan["file_name"]
-                )
-                memory.update_preference("last_directory", plan["directory"])
+                # Organize runs and most searches report files as they go
+                if plan["action"] in STREAMED_ACTIONS:
+                    print(stream_plan(executor, plan))
+                    memory.update_preference("last_directory", plan["directory"])
+                
+                else:
+                    if plan["action"] == "find_file_fuzzy":
+                        result = executor.find_file_fuzzy(
+                            plan["directory"],
+                            plan["file_name"]
+                        )
+                    
+                    elif plan["action"] == "find_duplicates":
+                        result = executor.find_duplicates(plan["directory"])
+                    
+                    elif plan["action"] == "undo_organize":
+                        result = executor.undo_last_organize(plan["directory"], progress=Progress(print_progress))
+                    
+                    if plan["directory"] is not None:
+                        memory.update_preference("last_directory", plan["directory"])
+                    
+                    # Print results
+                    print(format_response(result, plan))
+                
+                # Start watching the directory if it became the last used one
+                watcher.sync_workspaces()
                 
-            # Print results
-            print(format_response(result, plan))
-            
         except KeyboardInterrupt:
             print("\nOperation cancelled by user.")
             